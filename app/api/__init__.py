@@ -1,8 +1,28 @@
+from contextlib import asynccontextmanager
 from fastapi import APIRouter
 from app.api.storage import router as storage_router
 from app.api.wine import router as wine_router
+from app.api.images import router as images_router
+from app.api.jobs import router as jobs_router
+from app.api.stats import router as stats_router
+from app.services.image_service import shutdown_image_executor
+from app.services.job_queue import job_queue
+from app.services.openai_service import close_http_client
 
-# Create main API router and include sub-routers
-router = APIRouter()
+@asynccontextmanager
+async def lifespan(app):
+    """Start the job workers, and release them and the shared connections on shutdown"""
+    await job_queue.start()
+    yield
+    await job_queue.stop()
+    await close_http_client()
+    shutdown_image_executor()
+
+# Create main API router and include sub-routers. Its lifespan is merged
+# into the lifespan of the application that includes it.
+router = APIRouter(lifespan=lifespan)
 router.include_router(storage_router)
-router.include_router(wine_router)
\ No newline at end of file
+router.include_router(wine_router)
+router.include_router(images_router)
+router.include_router(jobs_router)
+router.include_router(stats_router)
@@ -0,0 +1,26 @@
+from fastapi import APIRouter, HTTPException, status
+from fastapi.responses import FileResponse
+
+from app.services.thumbnail_service import get_thumbnail, THUMBNAIL_CACHE_CONTROL
+
+router = APIRouter(prefix="/images", tags=["images"])
+
+@router.get("/thumbs/{size}/{filename}")
+async def get_label_thumbnail(size: int, filename: str):
+    """Get a WebP thumbnail of an uploaded label image, rendering it on first request"""
+    try:
+        path = await get_thumbnail(filename, size)
+    except OSError:
+        path = None
+    
+    if not path:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Thumbnail not found"
+        )
+    
+    return FileResponse(
+        path,
+        media_type="image/webp",
+        headers={"Cache-Control": THUMBNAIL_CACHE_CONTROL}
+    )
@@ -0,0 +1,25 @@
+from fastapi import APIRouter, Depends, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.database import get_async_db
+from app.schemas.stats import CollectionStats
+from app.services.stats_service import AsyncStatsService
+from app.utils.etag import make_etag, not_modified
+
+router = APIRouter(prefix="/stats", tags=["stats"])
+
+@router.get("", response_model=CollectionStats)
+async def get_collection_stats(request: Request, response: Response, db: AsyncSession = Depends(get_async_db)):
+    """
+    Get wine counts by type, country, vintage decade, storage and zone
+    
+    Tagged with the wines and storages versions, so clients revalidate
+    with If-None-Match and get a 304 until the collection changes.
+    """
+    stats_service = AsyncStatsService(db)
+    version = await stats_service.get_version()
+    cached = not_modified(request, response, make_etag("stats", *version))
+    if cached:
+        return cached
+    
+    return await stats_service.get_stats(version)
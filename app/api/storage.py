@@ -1,24 +1,56 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
 
-from app.models.database import get_db
-from app.services.storage_service import StorageService
-from app.schemas.storage import StorageCreate, StorageUpdate, StorageResponse
+from app.models.database import get_async_db
+from app.models.versions import get_version_async
+from app.services.storage_service import AsyncStorageService
+from app.schemas.storage import (
+    StorageCreate, StorageUpdate, StorageResponse, StoragePage, StorageOccupancyResponse,
+    StorageRelocationRequest, StorageRelocationResponse
+)
+from app.utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from app.utils.etag import make_etag, not_modified
 
 router = APIRouter(prefix="/storage", tags=["storage"])
 
-@router.get("/", response_model=List[StorageResponse])
-async def get_storage_configurations(db: Session = Depends(get_db)):
-    """Get all storage configurations"""
-    storage_service = StorageService(db)
-    return storage_service.get_all_storages()
+@router.get("/", response_model=StoragePage)
+async def get_storage_configurations(
+    request: Request,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Maximum number of storages to return"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get a page of storage configurations, answering a matching If-None-Match with 304"""
+    version = await get_version_async(db, "storages")
+    cached = not_modified(request, response, make_etag("storages", version, limit, cursor))
+    if cached:
+        return cached
+    
+    storage_service = AsyncStorageService(db)
+    
+    try:
+        storages, next_cursor = await storage_service.get_storages_page(cursor=cursor, limit=limit)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+    
+    return {"items": storages, "next_cursor": next_cursor}
 
 @router.get("/{storage_id}", response_model=StorageResponse)
-async def get_storage_configuration(storage_id: str, db: Session = Depends(get_db)):
-    """Get a single storage configuration by ID"""
-    storage_service = StorageService(db)
-    storage = storage_service.get_storage_by_id(storage_id)
+async def get_storage_configuration(storage_id: str, request: Request, response: Response, db: AsyncSession = Depends(get_async_db)):
+    """Get a single storage configuration by ID, answering a matching If-None-Match with 304"""
+    version = await get_version_async(db, "storages")
+    cached = not_modified(request, response, make_etag("storage", version, storage_id))
+    if cached:
+        return cached
+    
+    storage_service = AsyncStorageService(db)
+    # Loaded at the ETag's version, never from an older cached snapshot
+    storage = await storage_service.get_storage_layout(storage_id, version)
     
     if not storage:
         raise HTTPException(
@@ -28,21 +60,38 @@ async def get_storage_configuration(storage_id: str, db: Session = Depends(get_d
     
     return storage
 
+@router.get("/{storage_id}/occupancy", response_model=StorageOccupancyResponse)
+async def get_storage_occupancy(storage_id: str, db: AsyncSession = Depends(get_async_db)):
+    """Get free positions and a per-zone occupancy grid for a storage"""
+    storage_service = AsyncStorageService(db)
+    return await storage_service.get_occupancy(storage_id)
+
+@router.post("/{storage_id}/relocate", response_model=StorageRelocationResponse)
+async def relocate_wines(storage_id: str, relocation: StorageRelocationRequest, db: AsyncSession = Depends(get_async_db)):
+    """
+    Move wines to new positions in a storage, all or nothing
+    
+    Moves may swap or rotate bottles among themselves; only the final
+    layout has to have one bottle per slot.
+    """
+    storage_service = AsyncStorageService(db)
+    return await storage_service.relocate(storage_id, relocation.moves)
+
 @router.post("/", response_model=StorageResponse, status_code=status.HTTP_201_CREATED)
-async def create_storage_configuration(storage_data: StorageCreate, db: Session = Depends(get_db)):
+async def create_storage_configuration(storage_data: StorageCreate, db: AsyncSession = Depends(get_async_db)):
     """Create a new storage configuration"""
-    storage_service = StorageService(db)
-    return storage_service.create_storage(storage_data)
+    storage_service = AsyncStorageService(db)
+    return await storage_service.create_storage(storage_data)
 
 @router.put("/{storage_id}", response_model=StorageResponse)
-async def update_storage_configuration(storage_id: str, storage_data: StorageUpdate, db: Session = Depends(get_db)):
+async def update_storage_configuration(storage_id: str, storage_data: StorageUpdate, db: AsyncSession = Depends(get_async_db)):
     """Update a storage configuration"""
-    storage_service = StorageService(db)
-    return storage_service.update_storage(storage_id, storage_data)
+    storage_service = AsyncStorageService(db)
+    return await storage_service.update_storage(storage_id, storage_data)
 
 @router.delete("/{storage_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_storage_configuration(storage_id: str, db: Session = Depends(get_db)):
+async def delete_storage_configuration(storage_id: str, db: AsyncSession = Depends(get_async_db)):
     """Delete a storage configuration"""
-    storage_service = StorageService(db)
-    storage_service.delete_storage(storage_id)
+    storage_service = AsyncStorageService(db)
+    await storage_service.delete_storage(storage_id)
     return None
\ No newline at end of file
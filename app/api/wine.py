@@ -1,36 +1,169 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query, File, UploadFile, Form
-from sqlalchemy.orm import Session
-from typing import List, Optional, Dict, Any
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status, Query, File, UploadFile, Form
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional, Dict, Any, Literal
 import json
-import os
+import orjson
 from datetime import datetime
 
-from app.models.database import get_db
-from app.services.storage_service import StorageService
-from app.schemas.wine import WineCreate, WineUpdate, WineResponse
+from app.models.database import get_async_db
+from app.services.storage_service import AsyncStorageService
+from app.services.wine_service import AsyncWineService, is_position_conflict
+from app.services.search_service import AsyncSearchService
+from app.schemas.wine import WineCreate, WineUpdate, WineResponse, WinePage, WineFilters, WineFilterOptions, WineSearchResult
 from app.models.wine import Wine
+from app.models.versions import get_version_async, get_versions_async
 from app.config import settings
-from app.services import openai_service
+from app.services.label_cache import label_cache
+from app.services.label_analysis_service import (
+    analyze_spooled_label, batch_snapshot, enqueue_batch_analysis, enqueue_label_analysis,
+    get_batch_job, stream_batch_items
+)
+from app.services.upload_service import spool_image_upload
+from app.services.import_service import WineImport, detect_format
+from app.services.export_service import stream_csv, stream_ndjson
+from app.utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from app.utils.etag import make_etag, not_modified
 
 router = APIRouter(prefix="/wine", tags=["wine"])
 
-@router.get("/", response_model=List[WineResponse])
-async def get_wines(
+async def commit_placement(db: AsyncSession) -> None:
+    """Commit a wine write, reporting a slot taken concurrently as 409 Conflict"""
+    try:
+        await db.commit()
+    except IntegrityError as e:
+        await db.rollback()
+        if is_position_conflict(e):
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Position already occupied"
+            )
+        raise
+
+def get_wine_filters(
     storage_id: Optional[str] = Query(None, description="Filter by storage ID"),
-    db: Session = Depends(get_db)
+    type: Optional[str] = Query(None, description="Filter by wine type"),
+    country: Optional[str] = Query(None, description="Filter by country"),
+    region: Optional[str] = Query(None, description="Filter by region"),
+    producer: Optional[str] = Query(None, description="Filter by producer"),
+    vintage_min: Optional[int] = Query(None, description="Earliest vintage to include"),
+    vintage_max: Optional[int] = Query(None, description="Latest vintage to include"),
+    q: Optional[str] = Query(None, description="Free-text search")
+) -> WineFilters:
+    """Collection filters shared by the list and export endpoints"""
+    return WineFilters(
+        storage_id=storage_id,
+        type=type,
+        country=country,
+        region=region,
+        producer=producer,
+        vintage_min=vintage_min,
+        vintage_max=vintage_max,
+        search=q.strip() if q else None
+    )
+
+@router.get("/", response_model=WinePage)
+async def get_wines(
+    request: Request,
+    response: Response,
+    filters: WineFilters = Depends(get_wine_filters),
+    sort: Literal["added_date", "name", "vintage"] = Query("added_date", description="Sort key"),
+    order: Literal["asc", "desc"] = Query("desc", description="Sort direction"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Maximum number of wines to return"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Get a page of wines matching the filters, newest first by default
+    
+    Responses carry an ETag derived from the collection version and the
+    query; a matching If-None-Match is answered with 304 before any wines
+    are loaded. Rows are selected as columns and encoded with orjson
+    without going through WineResponse validation.
+    """
+    version = await get_version_async(db, "wines")
+    etag = make_etag("wines", version, filters.model_dump_json(), sort, order, limit, cursor)
+    cached = not_modified(request, response, etag)
+    if cached:
+        return cached
+    
+    wine_service = AsyncWineService(db)
+    try:
+        wines, next_cursor = await wine_service.list_wine_rows(
+            filters,
+            sort=sort,
+            descending=order == "desc",
+            cursor=cursor,
+            limit=limit
+        )
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+    
+    # Rows are already plain WineResponse dicts; encode them in one pass
+    return Response(
+        content=orjson.dumps({"items": wines, "next_cursor": next_cursor}),
+        media_type="application/json",
+        headers=dict(response.headers)
+    )
+
+@router.get("/filters", response_model=WineFilterOptions)
+async def get_wine_filter_options(
+    storage_id: Optional[str] = Query(None, description="Restrict options to one storage"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get the distinct values available for each wine filter"""
+    wine_service = AsyncWineService(db)
+    return await wine_service.get_filter_options(storage_id)
+
+@router.get("/search", response_model=List[WineSearchResult])
+async def search_wines(
+    q: str = Query(..., min_length=1, description="Search text; the last word matches as a prefix"),
+    storage_id: Optional[str] = Query(None, description="Restrict results to one storage"),
+    limit: int = Query(20, ge=1, le=100, description="Maximum number of results"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Full-text search over wine names, descriptions and metadata, best matches first"""
+    search_service = AsyncSearchService(db)
+    return await search_service.search(q, limit=limit, storage_id=storage_id)
+
+@router.get("/export")
+async def export_wines(
+    format: Literal["ndjson", "csv"] = Query("ndjson", description="Export format"),
+    filters: WineFilters = Depends(get_wine_filters)
 ):
-    """Get all wines, optionally filtered by storage ID"""
-    query = db.query(Wine)
+    """
+    Export the wines matching the filters, oldest first
     
-    if storage_id:
-        query = query.filter(Wine.storage_id == storage_id)
+    Rows are streamed from the database in batches as they are written
+    out, so memory use does not grow with the size of the collection. CSV
+    exports carry wine_metadata as a JSON column and can be imported back
+    with POST /import.
+    """
+    if format == "csv":
+        content, media_type = stream_csv(filters), "text/csv"
+    else:
+        content, media_type = stream_ndjson(filters), "application/x-ndjson"
     
-    return query.all()
+    return StreamingResponse(
+        content,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="wines.{format}"'}
+    )
 
 @router.get("/{wine_id}", response_model=WineResponse)
-async def get_wine(wine_id: str, db: Session = Depends(get_db)):
-    """Get a wine by ID"""
-    wine = db.query(Wine).filter(Wine.id == wine_id).first()
+async def get_wine(wine_id: str, request: Request, response: Response, db: AsyncSession = Depends(get_async_db)):
+    """Get a wine by ID, answering a matching If-None-Match with 304"""
+    version = await get_version_async(db, "wines")
+    cached = not_modified(request, response, make_etag("wine", version, wine_id))
+    if cached:
+        return cached
+    
+    wine = await db.get(Wine, wine_id)
     
     if not wine:
         raise HTTPException(
@@ -43,12 +176,13 @@ async def get_wine(wine_id: str, db: Session = Depends(get_db)):
 @router.post("/", response_model=WineResponse, status_code=status.HTTP_201_CREATED)
 async def create_wine(
     wine_data: WineCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Add a new wine"""
     # Validate storage exists
-    storage_service = StorageService(db)
-    storage = storage_service.get_storage_by_id(wine_data.storage_id)
+    storage_service = AsyncStorageService(db)
+    versions = await get_versions_async(db)
+    storage = await storage_service.get_storage_layout(wine_data.storage_id, versions["storages"])
     
     if not storage:
         raise HTTPException(
@@ -57,11 +191,7 @@ async def create_wine(
         )
     
     # Validate position if provided
-    if wine_data.position and not storage_service.validate_position(wine_data.storage_id, wine_data.position):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid position or position already occupied"
-        )
+    await storage_service.check_position(storage, wine_data.position, versions["wines"])
     
     # Create wine
     db_wine = Wine(
@@ -74,40 +204,158 @@ async def create_wine(
     )
     
     db.add(db_wine)
-    db.commit()
-    db.refresh(db_wine)
+    await commit_placement(db)
+    await db.refresh(db_wine)
     
     return db_wine
 
 @router.post("/analyze-label", status_code=status.HTTP_200_OK)
 async def analyze_label(
+    request: Request,
     file: UploadFile = File(...),
-    db: Session = Depends(get_db)
+    background: bool = Query(False, description="Queue the analysis and return 202 with a job id"),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Analyze a wine label image using OpenAI and return the analysis"""
-    try:
-        # Save the uploaded file temporarily
-        file_location = f"temp_{file.filename}"
-        with open(file_location, "wb+") as file_object:
-            file_object.write(await file.read())
-        
-        # Analyze the label using OpenAI
-        analysis_result = openai_service.analyze_wine_label(file_location)
-        
-        # Clean up the temporary file
-        os.remove(file_location)
+    """
+    Analyze a wine label image using OpenAI and return the analysis
+    
+    Results are cached by the SHA-256 of the image, so rescanning the
+    same photo returns immediately without another vision call.
+    
+    With background=true the analysis runs as a background job, retried on
+    failure, and the response is 202 with a job id to poll at
+    GET /jobs/{job_id}. The job keeps running if the client disconnects.
+    """
+    # Stream the upload to a unique spool file, hashing it on the way
+    upload = await spool_image_upload(file)
+    
+    if background:
+        try:
+            job = await enqueue_label_analysis(db, upload)
+        except Exception:
+            await upload.discard()
+            raise
         
-        return analysis_result
+        status_url = str(request.url_for("get_job", job_id=job.id))
+        return JSONResponse(
+            status_code=status.HTTP_202_ACCEPTED,
+            content={"job_id": job.id, "status": job.status, "status_url": status_url},
+            headers={"Location": status_url}
+        )
+    
+    try:
+        return await analyze_spooled_label(db, upload)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error analyzing label: {str(e)}"
         )
+    finally:
+        # Clean up the spooled file
+        await upload.discard()
+
+@router.get("/analyze-label/cache-stats")
+async def get_label_cache_stats():
+    """Get hit/miss counters of the label analysis cache"""
+    return label_cache.stats()
+
+@router.post("/analyze-labels", status_code=status.HTTP_202_ACCEPTED)
+async def analyze_labels(
+    request: Request,
+    files: List[UploadFile] = File(...),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Analyze a batch of wine label images concurrently in the background
+    
+    Returns a job id right away. Poll GET /analyze-labels/{job_id} for
+    progress, or read GET /analyze-labels/{job_id}/stream to receive each
+    result as newline-delimited JSON as soon as it finishes. The batch runs
+    as a background job, so it survives the client disconnecting and is
+    resumed if the server restarts.
+    """
+    if len(files) > settings.label_batch_max_files:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.label_batch_max_files} images can be analyzed per batch"
+        )
+    
+    # Spool every image before responding; the request body is gone afterwards
+    uploads = []
+    try:
+        for file in files:
+            uploads.append(await spool_image_upload(file))
+        job = await enqueue_batch_analysis(db, uploads, [file.filename for file in files])
+    except Exception:
+        for upload in uploads:
+            await upload.discard()
+        raise
+    
+    return {
+        "job_id": job.id,
+        "status": "running",
+        "total": len(uploads),
+        "status_url": str(request.url_for("get_batch_analysis", job_id=job.id)),
+        "stream_url": str(request.url_for("stream_batch_analysis", job_id=job.id))
+    }
+
+async def _get_batch_or_404(db: AsyncSession, job_id: str):
+    job = await get_batch_job(db, job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Batch analysis not found"
+        )
+    return job
+
+@router.get("/analyze-labels/{job_id}")
+async def get_batch_analysis(job_id: str, db: AsyncSession = Depends(get_async_db)):
+    """Get the progress of a batch label analysis and the results so far"""
+    return batch_snapshot(await _get_batch_or_404(db, job_id))
+
+@router.get("/analyze-labels/{job_id}/stream")
+async def stream_batch_analysis(job_id: str, db: AsyncSession = Depends(get_async_db)):
+    """Stream batch label analysis results as newline-delimited JSON, in completion order"""
+    await _get_batch_or_404(db, job_id)
+    
+    async def results():
+        async for item in stream_batch_items(job_id):
+            yield json.dumps(jsonable_encoder(item)) + "\n"
+    
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+@router.post("/import")
+async def import_wines(
+    file: UploadFile = File(...),
+    format: Optional[Literal["csv", "jsonl"]] = Query(None, description="Upload format; detected from the file name if omitted"),
+    dry_run: bool = Query(False, description="Validate every row without importing"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Import wines in bulk from a CSV or JSONL upload
+    
+    Columns (or keys) name, storage_id, position, description and
+    label_image_url set the wine itself; every other non-empty column is
+    stored in wine_metadata. Rows are validated against the storages and
+    their occupancy, and valid rows are inserted in chunked transactions.
+    
+    Returns:
+        Counts of imported and failed rows and the error of each failed row
+    """
+    import_format = format or detect_format(file.filename, file.content_type)
+    if import_format is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Unknown import format; upload a .csv or .jsonl file or pass format"
+        )
+    
+    wine_import = WineImport(db, chunk_rows=settings.import_chunk_rows)
+    return await wine_import.run(file.file, import_format, dry_run=dry_run)
 
 @router.put("/{wine_id}", response_model=WineResponse)
-async def update_wine(wine_id: str, wine_data: WineUpdate, db: Session = Depends(get_db)):
+async def update_wine(wine_id: str, wine_data: WineUpdate, db: AsyncSession = Depends(get_async_db)):
     """Update a wine"""
-    wine = db.query(Wine).filter(Wine.id == wine_id).first()
+    wine = await db.get(Wine, wine_id)
     
     if not wine:
         raise HTTPException(
@@ -116,41 +364,36 @@ async def update_wine(wine_id: str, wine_data: WineUpdate, db: Session = Depends
         )
     
     # Handle storage and position validation
-    storage_service = StorageService(db)
-    
-    if wine_data.storage_id and wine_data.storage_id != wine.storage_id:
-        # Validate new storage exists
-        if not storage_service.get_storage_by_id(wine_data.storage_id):
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Storage not found"
-            )
+    storage_service = AsyncStorageService(db)
     
-    # Use the existing or new storage_id for position validation
+    # Use the existing or new storage_id and position for validation
     storage_id = wine_data.storage_id or wine.storage_id
+    position = wine_data.position if "position" in wine_data.model_fields_set else wine.position
     
-    # Validate new position if provided
-    if wine_data.position and wine_data.position != wine.position:
-        if not storage_service.validate_position(storage_id, wine_data.position):
+    if storage_id != wine.storage_id or position != wine.position:
+        versions = await get_versions_async(db)
+        storage = await storage_service.get_storage_layout(storage_id, versions["storages"])
+        if not storage:
             raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Invalid position or position already occupied"
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Storage not found"
             )
+        await storage_service.check_position(storage, position, versions["wines"])
     
     # Update fields
     update_data = wine_data.model_dump(exclude_unset=True)
     for key, value in update_data.items():
         setattr(wine, key, value)
     
-    db.commit()
-    db.refresh(wine)
+    await commit_placement(db)
+    await db.refresh(wine)
     
     return wine
 
 @router.delete("/{wine_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_wine(wine_id: str, db: Session = Depends(get_db)):
+async def delete_wine(wine_id: str, db: AsyncSession = Depends(get_async_db)):
     """Delete a wine"""
-    wine = db.query(Wine).filter(Wine.id == wine_id).first()
+    wine = await db.get(Wine, wine_id)
     
     if not wine:
         raise HTTPException(
@@ -158,7 +401,7 @@ async def delete_wine(wine_id: str, db: Session = Depends(get_db)):
             detail="Wine not found"
         )
     
-    db.delete(wine)
-    db.commit()
+    await db.delete(wine)
+    await db.commit()
     
     return None
\ No newline at end of file
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from pydantic_settings import BaseSettings
 from dotenv import load_dotenv
 
@@ -8,7 +9,42 @@ class Settings(BaseSettings):
     app_name: str = os.getenv("APP_NAME", "Wine Storage")
     debug: bool = os.getenv("DEBUG", "True").lower() == "true"
     database_url: str = os.getenv("DATABASE_URL", "sqlite:///./wine_storage.db")
+    db_pool_size: int = int(os.getenv("DB_POOL_SIZE", "5"))
+    db_max_overflow: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    sqlite_journal_mode: str = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+    sqlite_synchronous: str = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+    sqlite_mmap_size: int = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+    sqlite_cache_size: int = int(os.getenv("SQLITE_CACHE_SIZE", "-65536"))  # Negative values are KiB, positive values pages
+    sqlite_busy_timeout_ms: int = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
     openai_api_key: str = os.getenv("OPENAI_API_KEY", "")
+    openai_base_url: str = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
+    openai_model: str = os.getenv("OPENAI_MODEL", "gpt-4-vision-preview")
+    openai_structured_output: bool = os.getenv("OPENAI_STRUCTURED_OUTPUT", "False").lower() == "true"
+    openai_connect_timeout: float = float(os.getenv("OPENAI_CONNECT_TIMEOUT", "5"))
+    openai_read_timeout: float = float(os.getenv("OPENAI_READ_TIMEOUT", "60"))
+    openai_max_connections: int = int(os.getenv("OPENAI_MAX_CONNECTIONS", "10"))
+    openai_max_concurrency: int = int(os.getenv("OPENAI_MAX_CONCURRENCY", "4"))
+    label_cache_ttl_seconds: int = int(os.getenv("LABEL_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+    label_cache_max_entries: int = int(os.getenv("LABEL_CACHE_MAX_ENTRIES", "10000"))
+    label_cache_memory_entries: int = int(os.getenv("LABEL_CACHE_MEMORY_ENTRIES", "256"))
+    label_batch_concurrency: int = int(os.getenv("LABEL_BATCH_CONCURRENCY", "4"))
+    label_batch_max_files: int = int(os.getenv("LABEL_BATCH_MAX_FILES", "60"))
+    job_workers: int = int(os.getenv("JOB_WORKERS", "2"))
+    job_max_attempts: int = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+    job_retry_backoff_seconds: float = float(os.getenv("JOB_RETRY_BACKOFF_SECONDS", "2.0"))
+    job_retention_seconds: int = int(os.getenv("JOB_RETENTION_SECONDS", str(7 * 24 * 3600)))
+    job_stale_seconds: float = float(os.getenv("JOB_STALE_SECONDS", "300"))
+    import_chunk_rows: int = int(os.getenv("IMPORT_CHUNK_ROWS", "1000"))
+    export_batch_rows: int = int(os.getenv("EXPORT_BATCH_ROWS", "500"))
+    upload_dir: str = os.getenv("UPLOAD_DIR", "uploads")
+    thumbnail_dir: str = os.getenv("THUMBNAIL_DIR", "derived/thumbs")
+    upload_spool_dir: str = os.getenv("UPLOAD_SPOOL_DIR", os.path.join(tempfile.gettempdir(), "wine_concierge_uploads"))
+    max_upload_bytes: int = int(os.getenv("MAX_UPLOAD_BYTES", str(20 * 1024 * 1024)))
+    upload_chunk_bytes: int = int(os.getenv("UPLOAD_CHUNK_BYTES", str(64 * 1024)))
+    label_image_max_edge: int = int(os.getenv("LABEL_IMAGE_MAX_EDGE", "1568"))
+    label_image_format: str = os.getenv("LABEL_IMAGE_FORMAT", "JPEG")
+    label_image_quality: int = int(os.getenv("LABEL_IMAGE_QUALITY", "85"))
+    image_process_workers: int = int(os.getenv("IMAGE_PROCESS_WORKERS", "2"))
     
     class Config:
         env_file = ".env"
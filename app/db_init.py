@@ -0,0 +1,82 @@
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.schema import CreateColumn
+
+from app.models.database import Base, engine
+from app.models.storage import Storage
+from app.models.wine import Wine
+from app.models.label_cache import LabelAnalysisCacheEntry
+from app.models.job import Job
+from app.models.search import create_search_index
+from app.models.versions import create_version_tracking
+
+# Indexes superseded by later schema changes, dropped from existing databases
+RETIRED_INDEXES = (
+    # json_extract expression indexes, replaced by the indexed generated columns on wines
+    "ix_wines_metadata_type",
+    "ix_wines_metadata_country",
+    "ix_wines_metadata_region",
+    "ix_wines_metadata_producer",
+    "ix_wines_metadata_vintage",
+    # Replaced by the (vintage, id) keyset index
+    "ix_wines_vintage",
+)
+
+def _add_missing_columns(connection) -> None:
+    """
+    Add columns missing from tables that already exist.
+
+    Columns declared after their table was first created are nullable or
+    VIRTUAL generated columns, both of which SQLite allows in ALTER TABLE
+    ADD COLUMN; generated values are computed from the existing rows as
+    they are read, so no backfill is needed. table_xinfo is used because
+    table_info leaves generated columns out.
+    """
+    for table in Base.metadata.sorted_tables:
+        existing_columns = {
+            row[1] for row in connection.execute(text(f"PRAGMA table_xinfo({table.name})"))
+        }
+        for column in table.columns:
+            if column.name not in existing_columns:
+                ddl = CreateColumn(column).compile(dialect=connection.dialect)
+                connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {ddl}"))
+
+def init_db():
+    """
+    Create database tables and bring an existing database up to date.
+
+    create_all only creates missing tables, so columns and indexes
+    declared on tables that already exist are added here
+    individually. Existing indexes are looked up in sqlite_master because
+    SQLAlchemy cannot reflect expression-based indexes.
+    """
+    Base.metadata.create_all(bind=engine)
+
+    with engine.begin() as connection:
+        _add_missing_columns(connection)
+        for name in RETIRED_INDEXES:
+            connection.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+        existing_indexes = {
+            name for (name,) in connection.execute(
+                text("SELECT name FROM sqlite_master WHERE type = 'index'")
+            )
+        }
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                if index.name not in existing_indexes:
+                    try:
+                        index.create(bind=connection)
+                    except IntegrityError as e:
+                        raise RuntimeError(
+                            f"Cannot create unique index {index.name}: existing rows "
+                            f"violate it and must be fixed first ({e.orig})"
+                        ) from e
+
+        create_search_index(connection)
+        create_version_tracking(connection)
+
+    print("Database tables created.")
+
+if __name__ == "__main__":
+    init_db()
@@ -1,5 +1,7 @@
-from app.models.database import Base, get_db
+from app.models.database import Base, get_db, get_async_db
 from app.models.storage import Storage
 from app.models.wine import Wine
+from app.models.label_cache import LabelAnalysisCacheEntry
+from app.models.job import Job
 
-__all__ = ["Base", "get_db", "Storage", "Wine"]
\ No newline at end of file
+__all__ = ["Base", "get_db", "get_async_db", "Storage", "Wine", "LabelAnalysisCacheEntry", "Job"]
\ No newline at end of file
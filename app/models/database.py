@@ -1,15 +1,87 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 
 from app.config import settings
 
+def async_database_url(database_url: str) -> str:
+    """Map a sync SQLite URL onto the aiosqlite driver"""
+    if database_url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + database_url[len("sqlite://"):]
+    return database_url
+
+def is_sqlite(database_url: str) -> bool:
+    return database_url.startswith("sqlite")
+
+def is_sqlite_memory(database_url: str) -> bool:
+    """Whether a SQLite URL names an in-memory database"""
+    path = database_url.split("://", 1)[-1]
+    return path in ("", "/", "/:memory:") or "mode=memory" in path
+
+def engine_options(database_url: str, asynchronous: bool = False) -> dict:
+    """
+    create_engine arguments for a database URL
+
+    In-memory SQLite databases live in a single connection that SQLAlchemy
+    pools specially, so they keep the default pool. File databases get a
+    sized pool whose connections may be checked out by any thread. The
+    pool class is named explicitly: SQLAlchemy before 2.0.38 defaults
+    aiosqlite file databases to NullPool, which rejects pool sizes.
+    """
+    if not is_sqlite(database_url):
+        return {"pool_size": settings.db_pool_size, "max_overflow": settings.db_max_overflow}
+    if is_sqlite_memory(database_url):
+        return {}
+    return {
+        "poolclass": AsyncAdaptedQueuePool if asynchronous else QueuePool,
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "connect_args": {"check_same_thread": False}
+    }
+
+def set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    """
+    Configure each new SQLite connection
+
+    WAL lets readers proceed while a writer commits, and synchronous=NORMAL
+    is durable in WAL mode except for the last commits before a power loss.
+    The busy timeout makes a connection wait for a lock instead of failing
+    with "database is locked".
+    """
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"PRAGMA journal_mode={settings.sqlite_journal_mode}")
+        cursor.execute(f"PRAGMA synchronous={settings.sqlite_synchronous}")
+        cursor.execute(f"PRAGMA mmap_size={settings.sqlite_mmap_size:d}")
+        cursor.execute(f"PRAGMA cache_size={settings.sqlite_cache_size:d}")
+        cursor.execute(f"PRAGMA busy_timeout={settings.sqlite_busy_timeout_ms:d}")
+    finally:
+        cursor.close()
+
 # Create SQLAlchemy engine
-engine = create_engine(settings.database_url)
+engine = create_engine(settings.database_url, **engine_options(settings.database_url))
+
+# Async engine for request handlers, so queries do not block the event loop
+async_engine = create_async_engine(
+    async_database_url(settings.database_url),
+    **engine_options(settings.database_url, asynchronous=True)
+)
+
+if is_sqlite(settings.database_url):
+    event.listen(engine, "connect", set_sqlite_pragmas)
+    event.listen(async_engine.sync_engine, "connect", set_sqlite_pragmas)
 
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Objects stay loaded after commit so responses can be serialized without
+# implicit (and, under asyncio, impossible) lazy refreshes
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
 # Create base class for models
 Base = declarative_base()
 
@@ -19,4 +91,9 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# Async database dependency for FastAPI
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,31 @@
+import uuid
+import datetime
+from sqlalchemy import Column, String, Integer, JSON, DateTime, Text, Index
+
+from app.models.database import Base
+
+class Job(Base):
+    __tablename__ = "jobs"
+    __table_args__ = (
+        # Recovery of unfinished jobs on startup and pruning of old ones
+        Index("ix_jobs_status_created_at", "status", "created_at"),
+        Index("ix_jobs_finished_at", "finished_at"),
+    )
+    
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    kind = Column(String, nullable=False)
+    status = Column(String, nullable=False, default="queued")  # queued, running, succeeded, failed
+    payload = Column(JSON)
+    result = Column(JSON)
+    error = Column(Text)  # Error of the last failed attempt
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=1)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    started_at = Column(DateTime)
+    # Refreshed by the worker while the job runs; a running job whose
+    # heartbeat stops was interrupted and is reclaimed
+    heartbeat_at = Column(DateTime)
+    finished_at = Column(DateTime)
+    
+    def __repr__(self):
+        return f"<Job(id='{self.id}', kind='{self.kind}', status='{self.status}')>"
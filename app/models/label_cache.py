@@ -0,0 +1,17 @@
+import datetime
+from sqlalchemy import Column, String, JSON, DateTime, Text
+
+from app.models.database import Base
+
+class LabelAnalysisCacheEntry(Base):
+    __tablename__ = "label_analysis_cache"
+    
+    # SHA-256 of the image digest and the analysis variant (label_cache.cache_key);
+    # the column keeps its original name so existing databases need no migration
+    cache_key = Column("image_sha256", String(64), primary_key=True)
+    description = Column(Text)
+    wine_metadata = Column(JSON)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow, index=True)
+    
+    def __repr__(self):
+        return f"<LabelAnalysisCacheEntry(cache_key='{self.cache_key}')>"
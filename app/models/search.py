@@ -0,0 +1,85 @@
+from sqlalchemy import text
+
+# Full-text index over wine names, descriptions and the text/number values of
+# wine_metadata. FTS5 rowids must be integers, but wines are keyed by UUID and
+# their implicit rowids may change on VACUUM, so wines_fts_docs assigns each
+# wine a stable document id.
+#
+# The index is maintained by triggers, so every write path (ORM, bulk Core
+# inserts, raw SQL) keeps it in sync without application code.
+
+_METADATA_TEXT = (
+    "(SELECT group_concat(value, ' ') FROM json_tree({row}.wine_metadata) "
+    "WHERE type IN ('text', 'integer', 'real'))"
+)
+
+def _index_document(row: str) -> str:
+    return (
+        "INSERT INTO wines_fts (rowid, wine_id, name, description, metadata) "
+        f"SELECT doc_id, {row}.id, {row}.name, {row}.description, {_METADATA_TEXT.format(row=row)} "
+        f"FROM wines_fts_docs WHERE wine_id = {row}.id;"
+    )
+
+def _remove_document(row: str) -> str:
+    return (
+        "DELETE FROM wines_fts WHERE rowid = "
+        f"(SELECT doc_id FROM wines_fts_docs WHERE wine_id = {row}.id);"
+    )
+
+SEARCH_INDEX_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS wines_fts_docs (
+        doc_id INTEGER PRIMARY KEY,
+        wine_id VARCHAR NOT NULL UNIQUE
+    )
+    """,
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS wines_fts USING fts5(
+        wine_id UNINDEXED,
+        name,
+        description,
+        metadata,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS wines_fts_after_insert AFTER INSERT ON wines BEGIN
+        INSERT INTO wines_fts_docs (wine_id) VALUES (NEW.id);
+        {_index_document("NEW")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS wines_fts_after_update
+    AFTER UPDATE OF name, description, wine_metadata ON wines BEGIN
+        {_remove_document("OLD")}
+        {_index_document("NEW")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS wines_fts_after_delete AFTER DELETE ON wines BEGIN
+        {_remove_document("OLD")}
+        DELETE FROM wines_fts_docs WHERE wine_id = OLD.id;
+    END
+    """,
+]
+
+def create_search_index(connection) -> None:
+    """Create the full-text index and its triggers, backfilling if out of sync"""
+    for statement in SEARCH_INDEX_DDL:
+        connection.execute(text(statement))
+
+    indexed = connection.execute(text("SELECT count(*) FROM wines_fts_docs")).scalar()
+    total = connection.execute(text("SELECT count(*) FROM wines")).scalar()
+    if indexed != total:
+        rebuild_search_index(connection)
+
+def rebuild_search_index(connection) -> None:
+    """Re-index every wine from scratch"""
+    connection.execute(text("DELETE FROM wines_fts"))
+    connection.execute(text("DELETE FROM wines_fts_docs"))
+    connection.execute(text("INSERT INTO wines_fts_docs (wine_id) SELECT id FROM wines"))
+    connection.execute(text(
+        "INSERT INTO wines_fts (rowid, wine_id, name, description, metadata) "
+        f"SELECT d.doc_id, w.id, w.name, w.description, {_METADATA_TEXT.format(row='w')} "
+        "FROM wines AS w JOIN wines_fts_docs AS d ON d.wine_id = w.id"
+    ))
@@ -0,0 +1,72 @@
+from typing import Dict
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+# Monotonic version counters of the wines and storages tables. Every insert,
+# update or delete bumps the table's counter through a trigger, so writes from
+# any path (ORM, bulk Core inserts, raw SQL, other processes) are counted.
+# Responses derived from a table can be tagged with its version and
+# revalidated with a single primary-key lookup.
+
+VERSIONED_TABLES = ("wines", "storages")
+
+def _version_triggers(table: str) -> list:
+    bump = f"UPDATE collection_versions SET version = version + 1 WHERE name = '{table}';"
+    return [
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_version_after_{event.lower()}
+        AFTER {event} ON {table} BEGIN
+            {bump}
+        END
+        """
+        for event in ("INSERT", "UPDATE", "DELETE")
+    ]
+
+VERSION_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS collection_versions (
+        name VARCHAR PRIMARY KEY,
+        version INTEGER NOT NULL DEFAULT 0
+    )
+    """,
+    *(
+        f"INSERT OR IGNORE INTO collection_versions (name, version) VALUES ('{table}', 0)"
+        for table in VERSIONED_TABLES
+    ),
+    *(trigger for table in VERSIONED_TABLES for trigger in _version_triggers(table)),
+]
+
+_VERSION_QUERY = text("SELECT version FROM collection_versions WHERE name = :name")
+_VERSIONS_QUERY = text("SELECT name, version FROM collection_versions")
+_CLAIM_QUERY = text("UPDATE collection_versions SET version = version + 1 WHERE name = :name RETURNING version")
+
+def create_version_tracking(connection) -> None:
+    """Create the version counters and the triggers that bump them"""
+    for statement in VERSION_DDL:
+        connection.execute(text(statement))
+
+def get_version(db: Session, table: str) -> int:
+    """Current version of a table"""
+    return db.execute(_VERSION_QUERY, {"name": table}).scalar() or 0
+
+async def get_version_async(db: AsyncSession, table: str) -> int:
+    """Current version of a table"""
+    return (await db.execute(_VERSION_QUERY, {"name": table})).scalar() or 0
+
+async def get_versions_async(db: AsyncSession) -> Dict[str, int]:
+    """Current version of every table, read in one query"""
+    versions = dict.fromkeys(VERSIONED_TABLES, 0)
+    versions.update((await db.execute(_VERSIONS_QUERY)).tuples().all())
+    return versions
+
+def claim_version(connection, table: str) -> int:
+    """
+    Bump a table's version as the first write of a transaction, returning
+    the version before it
+
+    The bump takes SQLite's write lock, so no other connection can commit
+    until this transaction ends: a version read before commit counts
+    exactly the writes of this transaction since the returned version.
+    """
+    return connection.execute(_CLAIM_QUERY, {"name": table}).scalar() - 1
@@ -1,12 +1,46 @@
 import uuid
 import datetime
-from sqlalchemy import Column, String, Integer, JSON, ForeignKey, DateTime, Text
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Computed, String, Integer, JSON, ForeignKey, DateTime, Text, Index, text
+from sqlalchemy.orm import deferred, relationship
 
 from app.models.database import Base
 
+# Unique index allowing at most one bottle per slot
+POSITION_INDEX = "uq_wines_storage_position"
+
+def _metadata_column(field: str, type_, index: bool = True):
+    """
+    Virtual column generated from a wine_metadata field, indexed unless
+    a composite index in __table_args__ covers it.
+    
+    SQLite computes the value from wine_metadata on every write path, so
+    the column and its index can never disagree with the JSON. The column
+    is deferred so loading a Wine does not evaluate it.
+    """
+    return deferred(Column(
+        type_,
+        Computed(f"json_extract(wine_metadata, '$.{field}')", persisted=False),
+        index=index
+    ))
+
 class Wine(Base):
     __tablename__ = "wines"
+    __table_args__ = (
+        # Keyset pagination over (added_date, id), optionally within a storage
+        Index("ix_wines_added_date_id", "added_date", "id"),
+        Index("ix_wines_storage_added_date_id", "storage_id", "added_date", "id"),
+        # Keyset pagination for the name and vintage sort keys
+        Index("ix_wines_name_id", "name", "id"),
+        Index("ix_wines_vintage_id", "vintage", "id"),
+        # At most one bottle per slot; wines without a position are unconstrained
+        Index(
+            POSITION_INDEX, "storage_id", "position",
+            unique=True, sqlite_where=text("position IS NOT NULL")
+        ),
+    )
+    # Generated columns are deferred and never read back from writes, so
+    # inserts need no RETURNING clause to fetch them
+    __mapper_args__ = {"eager_defaults": False}
     
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     
@@ -23,8 +57,22 @@ class Wine(Base):
     description = Column(Text)  # Full text description from OpenAI analysis
     wine_metadata = Column(JSON)  # All wine metadata in a single JSON field
     
+    # Metadata fields the collection is filtered, sorted and counted on
+    producer = _metadata_column("producer", String)
+    vintage = _metadata_column("vintage", Integer, index=False)
+    type = _metadata_column("type", String)
+    region = _metadata_column("region", String)
+    country = _metadata_column("country", String)
+    varietal = _metadata_column("varietal", String)
+    
     # Relationship with storage
     storage = relationship("Storage", back_populates="wines")
     
     def __repr__(self):
-        return f"<Wine(id='{self.id}', name='{self.name}')>"
\ No newline at end of file
+        return f"<Wine(id='{self.id}', name='{self.name}')>"
+
+# Metadata field -> its generated column
+METADATA_COLUMNS = {
+    field: getattr(Wine, field)
+    for field in ("producer", "vintage", "type", "region", "country", "varietal")
+}
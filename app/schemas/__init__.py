@@ -1,7 +1,18 @@
-from app.schemas.storage import StorageBase, StorageCreate, StorageUpdate, StorageResponse
-from app.schemas.wine import WineBase, WineCreate, WineUpdate, WineResponse
+from app.schemas.storage import (
+    StorageBase, StorageCreate, StorageUpdate, StorageResponse, StoragePage,
+    ZoneOccupancy, StorageOccupancyResponse,
+    RelocationMove, StorageRelocationRequest, RelocatedWine, StorageRelocationResponse
+)
+from app.schemas.wine import WineBase, WineCreate, WineUpdate, WineResponse, WinePage, WineFilters, WineFilterOptions, WineSearchResult, LabelAnalysis
+from app.schemas.job import JobResponse
+from app.schemas.stats import ValueCount, DecadeCount, ZoneStats, StorageStats, CollectionStats
 
 __all__ = [
-    "StorageBase", "StorageCreate", "StorageUpdate", "StorageResponse",
-    "WineBase", "WineCreate", "WineUpdate", "WineResponse"
+    "StorageBase", "StorageCreate", "StorageUpdate", "StorageResponse", "StoragePage",
+    "ZoneOccupancy", "StorageOccupancyResponse",
+    "RelocationMove", "StorageRelocationRequest", "RelocatedWine", "StorageRelocationResponse",
+    "WineBase", "WineCreate", "WineUpdate", "WineResponse", "WinePage",
+    "WineFilters", "WineFilterOptions", "WineSearchResult", "LabelAnalysis",
+    "JobResponse",
+    "ValueCount", "DecadeCount", "ZoneStats", "StorageStats", "CollectionStats"
 ]
\ No newline at end of file
@@ -0,0 +1,33 @@
+from typing import List, Optional
+from pydantic import BaseModel
+
+class ValueCount(BaseModel):
+    value: Optional[str] = None  # None counts wines without the field
+    count: int
+
+class DecadeCount(BaseModel):
+    decade: Optional[int] = None  # e.g. 2010 for 2010-2019; None counts wines without a vintage
+    count: int
+
+class ZoneStats(BaseModel):
+    name: str
+    capacity: int
+    occupied: int
+    fill_rate: float
+
+class StorageStats(BaseModel):
+    id: str
+    name: str
+    type: str
+    total_positions: int
+    wines: int  # All wines in the storage, with or without a position
+    occupied: int
+    fill_rate: float
+    zones: List[ZoneStats]
+
+class CollectionStats(BaseModel):
+    total_wines: int
+    by_type: List[ValueCount]
+    by_country: List[ValueCount]
+    by_vintage_decade: List[DecadeCount]
+    storages: List[StorageStats]
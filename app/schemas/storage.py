@@ -35,4 +35,42 @@ class StorageResponse(StorageBase):
     total_positions: int
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class StoragePage(BaseModel):
+    items: List[StorageResponse]
+    next_cursor: Optional[str] = None
+
+class ZoneOccupancy(BaseModel):
+    name: str
+    rows: int
+    columns: int
+    occupied: int
+    free_positions: List[str]
+    grid: List[List[bool]]
+
+class StorageOccupancyResponse(BaseModel):
+    storage_id: str
+    total_positions: int
+    occupied: int
+    free: int
+    free_positions: List[str]
+    zones: List[ZoneOccupancy]
+
+class RelocationMove(BaseModel):
+    wine_id: str
+    position: Optional[str] = None  # None takes the wine out of its slot
+
+class StorageRelocationRequest(BaseModel):
+    moves: List[RelocationMove]
+
+class RelocatedWine(BaseModel):
+    wine_id: str
+    from_storage_id: Optional[str] = None
+    from_position: Optional[str] = None
+    position: Optional[str] = None
+
+class StorageRelocationResponse(BaseModel):
+    storage_id: str
+    moved: int
+    wines: List[RelocatedWine]
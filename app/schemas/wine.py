@@ -1,6 +1,8 @@
-from typing import Dict, Optional, Any
+from typing import Dict, List, Optional, Any
 from datetime import datetime
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, computed_field
+
+from app.utils.thumbnails import thumbnail_url
 
 class WineBase(BaseModel):
     name: str
@@ -27,5 +29,49 @@ class WineResponse(WineBase):
     description: Optional[str] = None
     wine_metadata: Optional[Dict[str, Any]] = None
     
+    @computed_field
+    def label_thumb_url(self) -> Optional[str]:
+        """Small label image for list views"""
+        return thumbnail_url(self.label_image_url)
+    
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class WinePage(BaseModel):
+    items: List[WineResponse]
+    next_cursor: Optional[str] = None
+
+class WineFilters(BaseModel):
+    type: Optional[str] = None
+    country: Optional[str] = None
+    region: Optional[str] = None
+    producer: Optional[str] = None
+    vintage_min: Optional[int] = None
+    vintage_max: Optional[int] = None
+    storage_id: Optional[str] = None
+    search: Optional[str] = None
+
+class WineFilterOptions(BaseModel):
+    types: List[str]
+    countries: List[str]
+    regions: List[str]
+    producers: List[str]
+    vintages: List[int]
+
+class WineSearchResult(BaseModel):
+    wine: WineResponse
+    snippet: Optional[str] = None
+    rank: float
+
+class LabelAnalysis(BaseModel):
+    """Structured reply requested from the vision model when analyzing a label"""
+    model_config = ConfigDict(extra="forbid")
+    
+    name: str
+    producer: str
+    vintage: Optional[int]
+    type: str
+    varietal: List[str]
+    region: str
+    country: str
+    description: str
@@ -1,5 +1 @@
-# Don't try to import the analyze_wine_label function directly
-# Just import the module itself
-from app.services import storage_service
-
-__all__ = ["storage_service"]
\ No newline at end of file
+# services package
\ No newline at end of file
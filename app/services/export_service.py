@@ -0,0 +1,73 @@
+import csv
+import io
+import json
+from typing import Any, AsyncIterator, Dict, List
+from sqlalchemy import select
+
+from app.config import settings
+from app.models.database import AsyncSessionLocal
+from app.models.wine import Wine
+from app.schemas.wine import WineFilters
+from app.services.wine_service import apply_filters
+
+# Exported columns, in CSV column order
+EXPORT_COLUMNS = (
+    Wine.id,
+    Wine.name,
+    Wine.storage_id,
+    Wine.position,
+    Wine.added_date,
+    Wine.label_image_url,
+    Wine.description,
+    Wine.wine_metadata,
+)
+EXPORT_FIELDS = [column.key for column in EXPORT_COLUMNS]
+
+async def export_batches(filters: WineFilters, batch_rows: int = None) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Yield the wines matching the filters as batches of plain row dicts
+
+    Opens its own session, since a streaming response outlives the request's
+    dependencies. Plain columns are selected rather than Wine objects so
+    rows are not kept in a session identity map while the export runs.
+    """
+    statement = (
+        apply_filters(select(*EXPORT_COLUMNS), filters)
+        .order_by(Wine.added_date, Wine.id)
+        .execution_options(yield_per=batch_rows or settings.export_batch_rows)
+    )
+
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(statement)
+        async for partition in result.mappings().partitions():
+            yield [dict(row) for row in partition]
+
+def _json_default(value: Any) -> str:
+    # Only datetimes occur in exported rows besides JSON-native values
+    return value.isoformat()
+
+async def stream_ndjson(filters: WineFilters) -> AsyncIterator[str]:
+    """Export as newline-delimited JSON, one wine per line"""
+    async for batch in export_batches(filters):
+        yield "".join(
+            json.dumps(row, default=_json_default, ensure_ascii=False) + "\n"
+            for row in batch
+        )
+
+async def stream_csv(filters: WineFilters) -> AsyncIterator[str]:
+    """Export as CSV with a header row; wine_metadata is written as JSON"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    yield buffer.getvalue()
+
+    async for batch in export_batches(filters):
+        buffer.seek(0)
+        buffer.truncate()
+        for row in batch:
+            added_date = row["added_date"]
+            metadata = row["wine_metadata"]
+            row["added_date"] = added_date.isoformat() if added_date else ""
+            row["wine_metadata"] = json.dumps(metadata, ensure_ascii=False) if metadata else ""
+            writer.writerow([row[field] for field in EXPORT_FIELDS])
+        yield buffer.getvalue()
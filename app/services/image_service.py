@@ -0,0 +1,84 @@
+import asyncio
+import io
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Optional, Tuple
+from PIL import Image, ImageOps
+
+from app.config import settings
+from app.services.upload_service import sniff_image_type
+
+_MIME_TYPES = {"JPEG": "image/jpeg", "WEBP": "image/webp"}
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+def preprocess_image(path: str, max_edge: int, output_format: str = "JPEG", quality: int = 85) -> Tuple[bytes, str]:
+    """
+    Prepare an image for a vision model call
+
+    Applies the EXIF orientation, downscales so the longest edge is at most
+    max_edge, and re-encodes as JPEG or WebP. Runs in a worker process, so
+    it only takes and returns picklable values.
+
+    Returns:
+        (encoded bytes, MIME type). Images Pillow cannot decode are returned
+        unchanged with their sniffed MIME type.
+    """
+    output_format = output_format.upper()
+    if output_format not in _MIME_TYPES:
+        raise ValueError(f"Unsupported output format: {output_format}")
+
+    try:
+        with Image.open(path) as image:
+            # Let the JPEG decoder downscale by a power of two while decoding
+            image.draft("RGB", (max_edge, max_edge))
+            image = ImageOps.exif_transpose(image)
+            image.thumbnail((max_edge, max_edge), Image.LANCZOS)
+            if image.mode not in ("RGB", "L"):
+                image = image.convert("RGB")
+
+            buffer = io.BytesIO()
+            image.save(buffer, format=output_format, quality=quality, optimize=True)
+            return buffer.getvalue(), _MIME_TYPES[output_format]
+    except Image.UnidentifiedImageError:
+        with open(path, "rb") as image_file:
+            content = image_file.read()
+        detected = sniff_image_type(content[:16])
+        return content, detected[0] if detected else "application/octet-stream"
+
+def get_image_executor() -> ProcessPoolExecutor:
+    """
+    Get the process pool used for CPU-bound image work
+
+    Workers are spawned rather than forked: a forked child would inherit the
+    parent's event loop, database connections and held locks.
+    """
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.image_process_workers,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _executor
+
+def shutdown_image_executor() -> None:
+    """Stop the image worker processes; call on application shutdown"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+async def prepare_label_image(path: str) -> Tuple[bytes, str]:
+    """Preprocess a label photo in the process pool, off the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_image_executor(),
+        partial(
+            preprocess_image,
+            path,
+            settings.label_image_max_edge,
+            settings.label_image_format,
+            settings.label_image_quality
+        )
+    )
@@ -0,0 +1,252 @@
+import csv
+import io
+import json
+import uuid
+import datetime
+from typing import Any, Dict, IO, Iterator, List, Optional, Set, Tuple
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import iterate_in_threadpool
+
+from app.models.storage import Storage
+from app.models.wine import Wine
+from app.services.occupancy_service import occupancy_index, record_wine_moves, StorageOccupancy, WineMove
+from app.services.wine_service import is_position_conflict
+
+IMPORT_FORMATS = ("csv", "jsonl")
+
+# Columns stored on the wine itself; any other non-empty column goes into wine_metadata
+WINE_COLUMNS = ("name", "storage_id", "position", "description", "label_image_url")
+
+# Columns of an export that are assigned afresh on import
+IGNORED_COLUMNS = ("id", "added_date", "label_thumb_url")
+
+# Maximum number of rows listed in the error report
+MAX_REPORTED_ERRORS = 1000
+
+def detect_format(filename: Optional[str], content_type: Optional[str]) -> Optional[str]:
+    """Import format from an upload's file name or content type, or None if unknown"""
+    name = (filename or "").lower()
+    if name.endswith(".csv") or content_type == "text/csv":
+        return "csv"
+    if name.endswith((".jsonl", ".ndjson")) or content_type in ("application/x-ndjson", "application/jsonl"):
+        return "jsonl"
+    return None
+
+def _read_rows(file: IO[bytes], format: str) -> Iterator[Tuple[int, Any]]:
+    """Yield (line number, raw row) from an upload without reading it into memory"""
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    try:
+        if format == "csv":
+            reader = csv.DictReader(text)
+            for row in reader:
+                yield reader.line_num, row
+        else:
+            for line_number, line in enumerate(text, start=1):
+                if line.strip():
+                    yield line_number, line
+    finally:
+        # Leave the underlying upload file open for its owner
+        text.detach()
+
+def _parse_row(raw: Any, format: str) -> Dict[str, Any]:
+    """
+    Turn a raw CSV or JSONL row into Wine column values
+
+    Raises:
+        ValueError: If the row is malformed
+    """
+    if format == "jsonl":
+        try:
+            data = json.loads(raw)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON: {e.msg}")
+        if not isinstance(data, dict):
+            raise ValueError("Each line must be a JSON object")
+    else:
+        data = {key.strip(): value for key, value in raw.items() if key}
+        metadata_json = data.pop("wine_metadata", None)
+        if metadata_json:
+            try:
+                data["wine_metadata"] = json.loads(metadata_json)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Invalid wine_metadata JSON: {e.msg}")
+
+    for column in IGNORED_COLUMNS:
+        data.pop(column, None)
+
+    values = {}
+    for column in WINE_COLUMNS:
+        value = data.pop(column, None)
+        if isinstance(value, str):
+            value = value.strip() or None
+        values[column] = value
+
+    metadata = data.pop("wine_metadata", None) or {}
+    if not isinstance(metadata, dict):
+        raise ValueError("wine_metadata must be an object")
+    for key, value in data.items():
+        if value not in (None, ""):
+            metadata[key] = value.strip() if isinstance(value, str) else value
+
+    vintage = metadata.get("vintage")
+    if vintage is None:
+        metadata.pop("vintage", None)
+    elif isinstance(vintage, str):
+        # Numeric vintages are stored as years; others such as "NV" as given
+        try:
+            metadata["vintage"] = int(vintage)
+        except ValueError:
+            pass
+
+    if not values["name"]:
+        raise ValueError("name is required")
+    if not values["storage_id"]:
+        raise ValueError("storage_id is required")
+
+    values["wine_metadata"] = metadata or None
+    return values
+
+def _parse_batches(file: IO[bytes], format: str, batch_rows: int) -> Iterator[List[Tuple[int, Any]]]:
+    """
+    Parse an upload in batches of rows
+
+    Each row is (line number, column values), or (line number, ValueError)
+    if it is malformed.
+    """
+    batch: List[Tuple[int, Any]] = []
+    for line_number, raw in _read_rows(file, format):
+        try:
+            batch.append((line_number, _parse_row(raw, format)))
+        except ValueError as e:
+            batch.append((line_number, e))
+        if len(batch) >= batch_rows:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def _placement(values: Dict[str, Any]) -> WineMove:
+    return (None, None, values["storage_id"], values["position"])
+
+class WineImport:
+    """
+    One bulk import, validated against storages and occupancy loaded once.
+
+    Positions are checked against the cached occupancy bitsets plus the
+    positions claimed by earlier rows of the same file, so each row costs
+    no queries. Valid rows are inserted with executemany, one transaction
+    per chunk.
+    """
+
+    def __init__(self, db: AsyncSession, chunk_rows: int):
+        self.db = db
+        self.chunk_rows = chunk_rows
+        self.valid = 0
+        self.imported = 0
+        self.failed = 0
+        self.errors: List[Dict[str, Any]] = []
+        self._storages: Dict[str, Storage] = {}
+        self._occupancy: Dict[str, StorageOccupancy] = {}
+        self._claimed: Dict[str, Set[str]] = {}
+
+    async def load_storages(self) -> None:
+        result = await self.db.execute(select(Storage))
+        self._storages = {storage.id: storage for storage in result.scalars()}
+
+    async def _validate(self, values: Dict[str, Any]) -> None:
+        storage = self._storages.get(values["storage_id"])
+        if storage is None:
+            raise ValueError(f"Storage not found: {values['storage_id']}")
+
+        position = values["position"]
+        if position is None:
+            return
+
+        occupancy = self._occupancy.get(storage.id)
+        if occupancy is None:
+            occupancy = await occupancy_index.get_async(self.db, storage)
+            self._occupancy[storage.id] = occupancy
+        claimed = self._claimed.setdefault(storage.id, set())
+
+        if occupancy.locate(position) is None:
+            raise ValueError(f"Invalid position for this storage: {position}")
+        if position in claimed or not occupancy.is_free(position):
+            raise ValueError(f"Position already occupied: {position}")
+        claimed.add(position)
+
+    def _fail(self, line_number: int, message: str) -> None:
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": line_number, "error": message})
+
+    async def _insert(self, chunk: List[Tuple[int, Dict[str, Any]]]) -> None:
+        try:
+            await record_wine_moves(self.db, [_placement(values) for _, values in chunk])
+            await self.db.execute(insert(Wine), [values for _, values in chunk])
+            await self.db.commit()
+            self.imported += len(chunk)
+            return
+        except IntegrityError:
+            await self.db.rollback()
+
+        # A slot was taken concurrently; insert the chunk row by row to find it
+        for line_number, values in chunk:
+            try:
+                await record_wine_moves(self.db, [_placement(values)])
+                await self.db.execute(insert(Wine), [values])
+                await self.db.commit()
+                self.imported += 1
+            except IntegrityError as e:
+                await self.db.rollback()
+                if not is_position_conflict(e):
+                    raise
+                self._fail(line_number, f"Position already occupied: {values['position']}")
+
+    async def run(self, file: IO[bytes], format: str, dry_run: bool = False) -> Dict[str, Any]:
+        """Validate and insert every row of an upload, returning the report"""
+        await self.load_storages()
+        added_date = datetime.datetime.utcnow()
+
+        chunk: List[Tuple[int, Dict[str, Any]]] = []
+        try:
+            # Reading and parsing the upload is blocking work; it runs in a
+            # worker thread a batch at a time
+            batches = _parse_batches(file, format, self.chunk_rows)
+            async for batch in iterate_in_threadpool(batches):
+                for line_number, values in batch:
+                    if isinstance(values, ValueError):
+                        self._fail(line_number, str(values))
+                        continue
+                    try:
+                        await self._validate(values)
+                    except ValueError as e:
+                        self._fail(line_number, str(e))
+                        continue
+
+                    self.valid += 1
+                    values["id"] = str(uuid.uuid4())
+                    values["added_date"] = added_date
+                    chunk.append((line_number, values))
+
+                    if len(chunk) >= self.chunk_rows:
+                        if not dry_run:
+                            await self._insert(chunk)
+                        chunk = []
+        except UnicodeDecodeError:
+            self._fail(0, "File is not valid UTF-8")
+
+        if chunk and not dry_run:
+            await self._insert(chunk)
+        if dry_run:
+            # Nothing was written; report how many rows would have been imported
+            self.imported = self.valid
+
+        return {
+            "imported": self.imported,
+            "failed": self.failed,
+            "dry_run": dry_run,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors)
+        }
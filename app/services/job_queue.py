@@ -0,0 +1,259 @@
+import asyncio
+import datetime
+import logging
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from sqlalchemy import delete, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.database import AsyncSessionLocal
+from app.models.job import Job
+
+logger = logging.getLogger(__name__)
+
+# Stores a partial result of a running job, for clients polling it
+JobProgress = Callable[[Any], Awaitable[None]]
+JobHandler = Callable[[Dict[str, Any], JobProgress], Awaitable[Any]]
+JobCleanup = Callable[[Dict[str, Any]], Awaitable[None]]
+
+class JobFailed(Exception):
+    """Raised by a handler to fail a job without retrying it"""
+
+class JobQueue:
+    """
+    In-process background jobs, persisted in the jobs table.
+
+    Jobs are enqueued by kind with a JSON payload and run by a pool of
+    asyncio workers. A handler's return value becomes the job result; an
+    exception schedules a retry with exponential backoff until max_attempts,
+    except JobFailed, which fails the job at once. Finished jobs are kept
+    for retention_seconds.
+
+    Workers start with the application, or with the first enqueue outside
+    of one. A running job's heartbeat is refreshed every few seconds, so
+    several processes can share the table: a job is reclaimed only once its
+    heartbeat is older than stale_seconds, when the process running it has
+    died. Reclaimed jobs are requeued, or failed if they have no attempts
+    left.
+    """
+
+    def __init__(self, workers: int, max_attempts: int, retry_backoff_seconds: float, retention_seconds: int, stale_seconds: float):
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_backoff_seconds = retry_backoff_seconds
+        self.retention = datetime.timedelta(seconds=retention_seconds)
+        self.stale = datetime.timedelta(seconds=stale_seconds)
+        self.heartbeat_seconds = stale_seconds / 5
+        self._handlers: Dict[str, Tuple[JobHandler, Optional[JobCleanup]]] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tasks: set = set()
+        self._running: set = set()
+
+    def register(self, kind: str, handler: JobHandler, cleanup: Optional[JobCleanup] = None) -> None:
+        """
+        Register the handler for a kind of job
+
+        Args:
+            kind: Job kind passed to enqueue
+            handler: Coroutine function run with the job payload and a
+                coroutine function storing its progress as a partial result
+            cleanup: Optional coroutine function run with the payload once
+                the job has succeeded or finally failed
+        """
+        self._handlers[kind] = (handler, cleanup)
+
+    async def enqueue(self, db: AsyncSession, kind: str, payload: Dict[str, Any], max_attempts: Optional[int] = None) -> Job:
+        """Store a new job and hand it to the workers"""
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+
+        await self.start()
+
+        job = Job(kind=kind, payload=payload, max_attempts=max_attempts or self.max_attempts)
+        db.add(job)
+        await db.commit()
+
+        self._queue.put_nowait(job.id)
+        return job
+
+    async def get(self, db: AsyncSession, job_id: str) -> Optional[Job]:
+        return await db.get(Job, job_id)
+
+    async def stop(self) -> None:
+        """Stop the workers; call on application shutdown. Unfinished jobs resume on the next start."""
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks.clear()
+
+        if self._running:
+            # Interrupted on purpose, so requeued at once without using up an attempt
+            async with AsyncSessionLocal() as db:
+                await db.execute(
+                    update(Job)
+                    .where(Job.id.in_(self._running), Job.status == "running")
+                    .values(status="queued", attempts=Job.attempts - 1)
+                )
+                await db.commit()
+            self._running.clear()
+        self._queue = None
+        self._loop = None
+
+    async def start(self) -> None:
+        """Start the workers and pick up unfinished jobs; call on application startup"""
+        # Queues and tasks belong to the event loop that created them
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        self._tasks = set()
+
+        await self._reclaim()
+        async with AsyncSessionLocal() as db:
+            unfinished = (await db.execute(
+                select(Job.id).where(Job.status == "queued").order_by(Job.created_at)
+            )).scalars().all()
+        for job_id in unfinished:
+            self._queue.put_nowait(job_id)
+
+        for _ in range(self.workers):
+            self._spawn(self._work())
+        self._spawn(self._maintain())
+
+    async def _reclaim(self) -> List[str]:
+        """Requeue or fail running jobs whose heartbeat has stopped, returning the requeued ids"""
+        now = datetime.datetime.utcnow()
+        stale = (Job.status == "running") & or_(Job.heartbeat_at.is_(None), Job.heartbeat_at < now - self.stale)
+
+        async with AsyncSessionLocal() as db:
+            failed = (await db.execute(
+                update(Job)
+                .where(stale, Job.attempts >= Job.max_attempts)
+                .values(status="failed", error="Interrupted: the worker running the job stopped", finished_at=now)
+                .returning(Job.id, Job.kind, Job.payload)
+            )).all()
+            requeued = (await db.execute(
+                update(Job).where(stale).values(status="queued").returning(Job.id)
+            )).scalars().all()
+            await db.commit()
+
+        for job_id, kind, payload in failed:
+            logger.warning("Job %s was interrupted on its last attempt", job_id)
+            await self._cleanup(job_id, kind, payload)
+        return requeued
+
+    def _spawn(self, coroutine) -> None:
+        task = asyncio.create_task(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _work(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except Exception:
+                logger.exception("Job %s crashed its worker", job_id)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str) -> None:
+        now = datetime.datetime.utcnow()
+        async with AsyncSessionLocal() as db:
+            # Claim the job; it may have been queued twice or already be finished
+            claimed = await db.execute(
+                update(Job)
+                .where(Job.id == job_id, Job.status == "queued")
+                .values(status="running", attempts=Job.attempts + 1, started_at=now, heartbeat_at=now)
+            )
+            await db.commit()
+            if claimed.rowcount != 1:
+                return
+            job = await db.get(Job, job_id)
+
+            handler, _ = self._handlers.get(job.kind, (None, None))
+            retry = False
+            self._running.add(job.id)
+            heartbeat = asyncio.create_task(self._beat(job.id))
+            try:
+                if handler is None:
+                    raise JobFailed(f"No handler registered for job kind {job.kind}")
+                job.result = await handler(job.payload, partial(self._report, job.id))
+                job.status = "succeeded"
+                job.error = None
+            except Exception as e:
+                job.error = str(e) or type(e).__name__
+                retry = not isinstance(e, JobFailed) and job.attempts < job.max_attempts
+                job.status = "queued" if retry else "failed"
+            finally:
+                heartbeat.cancel()
+
+            if not retry:
+                job.finished_at = datetime.datetime.utcnow()
+            await db.commit()
+            self._running.discard(job.id)
+
+            if retry:
+                delay = self.retry_backoff_seconds * 2 ** (job.attempts - 1)
+                self._spawn(self._requeue(job.id, delay))
+            else:
+                await self._cleanup(job.id, job.kind, job.payload)
+
+    async def _beat(self, job_id: str) -> None:
+        while True:
+            await asyncio.sleep(self.heartbeat_seconds)
+            async with AsyncSessionLocal() as db:
+                await db.execute(
+                    update(Job)
+                    .where(Job.id == job_id, Job.status == "running")
+                    .values(heartbeat_at=datetime.datetime.utcnow())
+                )
+                await db.commit()
+
+    async def _report(self, job_id: str, result: Any) -> None:
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(Job)
+                .where(Job.id == job_id, Job.status == "running")
+                .values(result=result, heartbeat_at=datetime.datetime.utcnow())
+            )
+            await db.commit()
+
+    async def _cleanup(self, job_id: str, kind: str, payload: Dict[str, Any]) -> None:
+        _, cleanup = self._handlers.get(kind, (None, None))
+        if cleanup is None:
+            return
+        try:
+            await cleanup(payload)
+        except Exception:
+            logger.exception("Cleanup of job %s failed", job_id)
+
+    async def _requeue(self, job_id: str, delay: float) -> None:
+        await asyncio.sleep(delay)
+        self._queue.put_nowait(job_id)
+
+    async def _maintain(self) -> None:
+        """Reclaim interrupted jobs and delete jobs finished longer than the retention period ago"""
+        while True:
+            await asyncio.sleep(min(60.0, self.heartbeat_seconds))
+            try:
+                for job_id in await self._reclaim():
+                    self._queue.put_nowait(job_id)
+                async with AsyncSessionLocal() as db:
+                    await db.execute(delete(Job).where(Job.finished_at < datetime.datetime.utcnow() - self.retention))
+                    await db.commit()
+            except Exception:
+                logger.exception("Job queue maintenance failed")
+
+job_queue = JobQueue(
+    workers=settings.job_workers,
+    max_attempts=settings.job_max_attempts,
+    retry_backoff_seconds=settings.job_retry_backoff_seconds,
+    retention_seconds=settings.job_retention_seconds,
+    stale_seconds=settings.job_stale_seconds
+)
@@ -0,0 +1,166 @@
+import asyncio
+import copy
+import dataclasses
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.database import AsyncSessionLocal
+from app.models.job import Job
+from app.services import openai_service
+from app.services.job_queue import job_queue, JobFailed, JobProgress
+from app.services.label_cache import cache_key, label_cache
+from app.services.upload_service import SpooledUpload
+
+async def analyze_spooled_label(db: AsyncSession, upload: SpooledUpload) -> Dict[str, Any]:
+    """
+    Analyze a spooled label image, going through the label analysis cache
+
+    Successful analyses are cached by the SHA-256 of the image and the
+    analysis variant, so rescanning the same photo returns immediately
+    without another vision call, while changing the reply mode, prompt or
+    model analyzes it afresh.
+    """
+    key = cache_key(upload.sha256, openai_service.analysis_variant())
+    cached = await label_cache.get(db, key)
+    if cached is not None:
+        return {"success": True, **cached, "cached": True}
+
+    analysis_result = await openai_service.analyze_wine_label(upload.path)
+
+    if analysis_result.get("success"):
+        await label_cache.put(
+            db,
+            key,
+            analysis_result["description"],
+            analysis_result["wine_metadata"]
+        )
+
+    return analysis_result
+
+ANALYZE_LABEL_JOB = "analyze_label"
+
+async def enqueue_label_analysis(db: AsyncSession, upload: SpooledUpload):
+    """Queue a background analysis of a spooled label image; the job discards the file when done"""
+    return await job_queue.enqueue(db, ANALYZE_LABEL_JOB, dataclasses.asdict(upload))
+
+async def _run_label_analysis_job(payload: Dict[str, Any], progress: JobProgress) -> Dict[str, Any]:
+    upload = SpooledUpload(**payload)
+    if not settings.openai_api_key:
+        raise JobFailed("OpenAI API key not found. Please set the OPENAI_API_KEY environment variable.")
+
+    async with AsyncSessionLocal() as db:
+        result = await analyze_spooled_label(db, upload)
+    if not result.get("success"):
+        # Vision call failed; raising lets the queue retry it
+        raise RuntimeError(result.get("error") or "Label analysis failed")
+    return result
+
+async def _discard_label_analysis_job(payload: Dict[str, Any]) -> None:
+    await SpooledUpload(**payload).discard()
+
+job_queue.register(ANALYZE_LABEL_JOB, _run_label_analysis_job, cleanup=_discard_label_analysis_job)
+
+ANALYZE_LABEL_BATCH_JOB = "analyze_label_batch"
+
+# How often a batch stream looks for newly finished items
+BATCH_STREAM_POLL_SECONDS = 0.25
+
+async def enqueue_batch_analysis(db: AsyncSession, uploads: List[SpooledUpload], filenames: List[Optional[str]]) -> Job:
+    """Queue a background analysis of a batch of spooled label images; the job discards the files when done"""
+    payload = {"uploads": [dataclasses.asdict(upload) for upload in uploads], "filenames": filenames}
+    return await job_queue.enqueue(db, ANALYZE_LABEL_BATCH_JOB, payload)
+
+async def _run_batch_analysis_job(payload: Dict[str, Any], progress: JobProgress) -> Dict[str, Any]:
+    """
+    Analyze the labels of a batch concurrently, storing progress as each finishes
+
+    The job result holds every item and the order they finished in, so
+    clients can show each label as soon as its analysis is ready. A retried
+    batch starts over, but analyses that succeeded before come from the
+    label cache.
+    """
+    uploads = [SpooledUpload(**upload) for upload in payload["uploads"]]
+    items = _pending_items(payload["filenames"])
+    finish_order: List[int] = []
+    slots = asyncio.Semaphore(settings.label_batch_concurrency)
+    reporting = asyncio.Lock()
+
+    async def report() -> None:
+        async with reporting:
+            await progress(copy.deepcopy({"items": items, "finish_order": finish_order}))
+
+    async def analyze(index: int) -> None:
+        item = items[index]
+        async with slots:
+            item["status"] = "running"
+            await report()
+            try:
+                async with AsyncSessionLocal() as db:
+                    result = await analyze_spooled_label(db, uploads[index])
+                item["status"] = "succeeded" if result.get("success") else "failed"
+                item["result"] = result
+            except Exception as e:
+                item["status"] = "failed"
+                item["result"] = {"success": False, "error": f"Error analyzing label: {str(e)}"}
+        finish_order.append(index)
+        await report()
+
+    await asyncio.gather(*(analyze(index) for index in range(len(items))))
+    return {"items": items, "finish_order": finish_order}
+
+async def _discard_batch_analysis_job(payload: Dict[str, Any]) -> None:
+    for upload in payload["uploads"]:
+        await SpooledUpload(**upload).discard()
+
+job_queue.register(ANALYZE_LABEL_BATCH_JOB, _run_batch_analysis_job, cleanup=_discard_batch_analysis_job)
+
+def _pending_items(filenames: List[Optional[str]]) -> List[Dict[str, Any]]:
+    return [
+        {"index": index, "filename": filename, "status": "pending", "result": None}
+        for index, filename in enumerate(filenames)
+    ]
+
+def _batch_progress(job: Job) -> Tuple[List[Dict[str, Any]], List[int]]:
+    progress = job.result or {}
+    return progress.get("items") or _pending_items(job.payload["filenames"]), progress.get("finish_order", [])
+
+def _batch_finished(job: Job) -> bool:
+    return job.status in ("succeeded", "failed")
+
+async def get_batch_job(db: AsyncSession, job_id: str) -> Optional[Job]:
+    """The job of a batch label analysis, or None if there is no such batch"""
+    job = await job_queue.get(db, job_id)
+    return job if job is not None and job.kind == ANALYZE_LABEL_BATCH_JOB else None
+
+def batch_snapshot(job: Job) -> Dict[str, Any]:
+    """Progress of a batch and every result available so far"""
+    items, finish_order = _batch_progress(job)
+    finished = [items[index] for index in finish_order]
+    return {
+        "job_id": job.id,
+        "status": {"succeeded": "completed", "failed": "failed"}.get(job.status, "running"),
+        "total": len(items),
+        "completed": len(finished),
+        "succeeded": sum(1 for item in finished if item["status"] == "succeeded"),
+        "failed": sum(1 for item in finished if item["status"] == "failed"),
+        "created_at": job.created_at,
+        "finished_at": job.finished_at,
+        "items": items,
+    }
+
+async def stream_batch_items(job_id: str) -> AsyncIterator[Dict[str, Any]]:
+    """Yield each item of a batch as its analysis finishes, until the batch is done"""
+    sent = 0
+    while True:
+        async with AsyncSessionLocal() as db:
+            job = await get_batch_job(db, job_id)
+        if job is None:
+            return
+        items, finish_order = _batch_progress(job)
+        for index in finish_order[sent:]:
+            yield items[index]
+        sent = len(finish_order)
+        if _batch_finished(job):
+            return
+        await asyncio.sleep(BATCH_STREAM_POLL_SECONDS)
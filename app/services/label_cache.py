@@ -0,0 +1,117 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.label_cache import LabelAnalysisCacheEntry
+
+def cache_key(image_sha256: str, variant: str) -> str:
+    """
+    Key of an analysis of an image under an analysis variant
+
+    The variant names the reply mode, prompt version and model, so switching
+    any of them does not return analyses made under the previous one.
+    """
+    return hashlib.sha256(f"{image_sha256}:{variant}".encode()).hexdigest()
+
+class LabelAnalysisCache:
+    """
+    Label analysis results keyed by cache_key: the SHA-256 of the image
+    bytes together with the analysis variant that produced them.
+
+    A bounded in-process LRU sits in front of the label_analysis_cache
+    table, so repeat scans skip the vision call entirely and hot entries
+    skip the database as well. Entries expire after ttl_seconds; the table
+    is trimmed to max_entries, oldest first.
+    """
+
+    def __init__(self, ttl_seconds: int, max_entries: int, memory_entries: int):
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self._memory: "OrderedDict[str, Tuple[datetime, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+
+    def _expired(self, created_at: datetime) -> bool:
+        return created_at + self.ttl < datetime.utcnow()
+
+    def _remember(self, key: str, created_at: datetime, result: Dict[str, Any]) -> None:
+        with self._lock:
+            self._memory[key] = (created_at, result)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    async def get(self, db: AsyncSession, key: str) -> Optional[Dict[str, Any]]:
+        """Get the cached analysis for a cache key, or None on a miss"""
+        with self._lock:
+            cached = self._memory.get(key)
+            if cached is not None:
+                created_at, result = cached
+                if not self._expired(created_at):
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return result
+                del self._memory[key]
+
+        entry = await db.get(LabelAnalysisCacheEntry, key)
+        if entry is None or self._expired(entry.created_at):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        result = {"description": entry.description, "wine_metadata": entry.wine_metadata}
+        self._remember(key, entry.created_at, result)
+        with self._lock:
+            self.db_hits += 1
+        return result
+
+    async def put(self, db: AsyncSession, key: str, description: str, wine_metadata: Dict[str, Any]) -> None:
+        """Store a successful analysis and trim the table to max_entries"""
+        created_at = datetime.utcnow()
+        await db.merge(LabelAnalysisCacheEntry(
+            cache_key=key,
+            description=description,
+            wine_metadata=wine_metadata,
+            created_at=created_at
+        ))
+        await db.flush()
+
+        total = (await db.execute(select(func.count()).select_from(LabelAnalysisCacheEntry))).scalar()
+        if total > self.max_entries:
+            oldest = (
+                select(LabelAnalysisCacheEntry.cache_key)
+                .order_by(LabelAnalysisCacheEntry.created_at)
+                .limit(total - self.max_entries)
+            )
+            await db.execute(
+                delete(LabelAnalysisCacheEntry).where(LabelAnalysisCacheEntry.cache_key.in_(oldest))
+            )
+        await db.commit()
+
+        self._remember(key, created_at, {"description": description, "wine_metadata": wine_metadata})
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits = self.memory_hits + self.db_hits
+            lookups = hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "db_hits": self.db_hits,
+                "misses": self.misses,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+            }
+
+label_cache = LabelAnalysisCache(
+    ttl_seconds=settings.label_cache_ttl_seconds,
+    max_entries=settings.label_cache_max_entries,
+    memory_entries=settings.label_cache_memory_entries
+)
@@ -0,0 +1,137 @@
+import re
+from typing import Any, Dict, List, Optional
+
+# Heading spellings the model uses for each metadata field
+FIELD_ALIASES = {
+    "name": "name",
+    "wine": "name",
+    "wine name": "name",
+    "producer": "producer",
+    "winery": "producer",
+    "estate": "producer",
+    "domaine": "producer",
+    "vintage": "vintage",
+    "year": "vintage",
+    "type": "type",
+    "wine type": "type",
+    "style": "type",
+    "color": "type",
+    "colour": "type",
+    "varietal": "varietal",
+    "varietals": "varietal",
+    "grape": "varietal",
+    "grapes": "varietal",
+    "grape variety": "varietal",
+    "grape varieties": "varietal",
+    "region": "region",
+    "appellation": "region",
+    "country": "country",
+    "country of origin": "country",
+}
+
+WINE_TYPES = {
+    "red": "Red",
+    "white": "White",
+    "rosé": "Rosé",
+    "rose": "Rosé",
+    "sparkling": "Sparkling",
+    "dessert": "Dessert",
+    "fortified": "Fortified",
+    "orange": "Orange",
+}
+
+# One pass over the reply recognizes, in order of preference at each position:
+#   - heading lines such as "Producer: X", "**Producer:** X", "**Producer**: X"
+#     or "- **Producer:** X", with an optional list bullet or number; the value
+#     is captured in a lookahead, so the scan goes on inside it;
+#   - bare years and wine type words anywhere else, heading values included,
+#     kept as fallbacks for replies without vintage or type headings.
+_TOKEN_PATTERN = re.compile(
+    r"""
+    ^[ \t]*(?:[-*+•][ \t]+|\d+[.)][ \t]+)?      # optional list bullet
+    (?:\*\*|__)?[ \t]*
+    (?P<key>[A-Za-z][A-Za-z ]{0,24}?)[ \t]*
+    (?::[ \t]*(?:\*\*|__)|(?:\*\*|__)[ \t]*:|:) # colon inside or after the bold markers
+    [ \t]*(?=(?P<value>[^\n]*))
+    |
+    \b(?P<year>1[89]\d{2}|20\d{2})\b
+    |
+    \b(?P<type>red|white|rosé|rose|sparkling|dessert|fortified)\b
+    """,
+    re.IGNORECASE | re.MULTILINE | re.VERBOSE
+)
+
+_YEAR_PATTERN = re.compile(r"\b(1[89]\d{2}|20\d{2})\b")
+_WORD_SEPARATORS = re.compile(r"[^\wé]+")
+_VARIETAL_SEPARATORS = re.compile(r"\s*(?:,|;|/|&|\band\b)\s*", re.IGNORECASE)
+_VALUE_STRIP = " \t*_`\"'"
+
+def _clean(value: str) -> str:
+    value = value.strip(_VALUE_STRIP)
+    if value.endswith(".") and not value.endswith(".."):
+        value = value[:-1].rstrip(_VALUE_STRIP)
+    return value
+
+def _wine_type(value: str) -> str:
+    for word in _WORD_SEPARATORS.split(value.lower()):
+        if word in WINE_TYPES:
+            return WINE_TYPES[word]
+    return value
+
+def _vintage(value: str) -> Optional[int]:
+    match = _YEAR_PATTERN.search(value)
+    return int(match.group(1)) if match else None
+
+def _varietals(value: str) -> List[str]:
+    return [part for part in (_clean(p) for p in _VARIETAL_SEPARATORS.split(value)) if part]
+
+def extract_fields(description: str) -> Dict[str, Any]:
+    """
+    Extract wine metadata from a free-text label analysis in a single pass
+
+    Headings win over fallbacks, and the first heading of each field wins.
+    Without a vintage or type heading, the first year or type word anywhere
+    is used, including in the values of other headings ("Name: Chateau
+    Margaux 2015"). A vintage heading without a year (e.g. "NV") leaves the
+    vintage empty rather than falling back to the first year mentioned.
+
+    Returns:
+        Dict with name, producer, vintage (int or None), type, region,
+        country and varietal (list of grape names)
+    """
+    headings: Dict[str, str] = {}
+    first_year: Optional[str] = None
+    first_type: Optional[str] = None
+
+    for match in _TOKEN_PATTERN.finditer(description):
+        key = match.group("key")
+        if key is not None:
+            field = FIELD_ALIASES.get(" ".join(key.lower().split()))
+            if field is not None and field not in headings:
+                value = _clean(match.group("value"))
+                if value:
+                    headings[field] = value
+        elif match.group("year") is not None:
+            first_year = first_year or match.group("year")
+        elif first_type is None:
+            first_type = match.group("type")
+
+    if "vintage" in headings:
+        vintage = _vintage(headings["vintage"])
+    else:
+        vintage = int(first_year) if first_year else None
+
+    if "type" in headings:
+        wine_type = _wine_type(headings["type"])
+    else:
+        wine_type = WINE_TYPES[first_type.lower()] if first_type else ""
+
+    return {
+        "name": headings.get("name", ""),
+        "producer": headings.get("producer", ""),
+        "vintage": vintage,
+        "type": wine_type,
+        "region": headings.get("region", ""),
+        "country": headings.get("country", ""),
+        "varietal": _varietals(headings.get("varietal", "")),
+    }
@@ -0,0 +1,339 @@
+import copy
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import event, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models.storage import Storage
+from app.models.versions import claim_version, get_version, get_version_async
+from app.models.wine import Wine
+
+def position_label(scheme: str, zone_name: str, row: int, column: int, columns: int) -> str:
+    """
+    Label of a position, matching storage-manager.js generatePositions
+
+    Rows and columns are 1-based.
+    """
+    if scheme == "Sequential Numbering":
+        return str((row - 1) * columns + column)
+    if scheme == "Row-Column":
+        return f"{row}{chr(64 + column)}"
+    if scheme == "Zone-Position":
+        return f"{zone_name}-{row}{chr(64 + column)}"
+    return f"{zone_name}-{row}-{column}"
+
+def storage_layout(storage: Storage) -> Tuple[Any, ...]:
+    """The parts of a storage configuration that determine its positions"""
+    return (storage.position_naming_scheme, storage.total_positions, storage.zones)
+
+class StorageOccupancy:
+    """
+    Occupied slots of one storage, as one bitset per zone.
+
+    Slot n of a zone is (row - 1) * columns + (column - 1); bit n is set when
+    a wine occupies it. Free-slot scans work on whole machine words of the
+    bitset instead of on position strings.
+    """
+
+    def __init__(self, storage: Storage):
+        self.storage_id = storage.id
+        # Layout the bitsets were built for
+        self.layout = copy.deepcopy(storage_layout(storage))
+        self.zones: List[Tuple[str, int, int]] = []
+        self.labels: List[List[str]] = []
+        # Labels repeated across zones, and per zone the slots whose label an
+        # earlier zone already owns; such slots can never be filled
+        self.duplicate_labels: List[str] = []
+        self.shadowed: List[int] = []
+        self._slots: Dict[str, Tuple[int, int]] = {}
+
+        zones = storage.zones or []
+        if zones:
+            for zone in zones:
+                dimensions = zone.get("dimensions") or {}
+                self._add_zone(
+                    storage.position_naming_scheme,
+                    zone.get("name", ""),
+                    dimensions.get("rows") or 1,
+                    dimensions.get("columns") or 1
+                )
+        else:
+            # Storage without zones: a single row of "Position n" slots
+            self.zones.append(("", 1, storage.total_positions))
+            self.labels.append([f"Position {n}" for n in range(1, storage.total_positions + 1)])
+            self.shadowed.append(0)
+            for slot, label in enumerate(self.labels[0]):
+                self._slots.setdefault(label, (0, slot))
+
+        self.bits: List[int] = [0] * len(self.zones)
+
+    def _add_zone(self, scheme: str, name: str, rows: int, columns: int) -> None:
+        zone_index = len(self.zones)
+        self.zones.append((name, rows, columns))
+        labels = [
+            position_label(scheme, name, row, column, columns)
+            for row in range(1, rows + 1)
+            for column in range(1, columns + 1)
+        ]
+        self.labels.append(labels)
+        shadowed = 0
+        for slot, label in enumerate(labels):
+            # Schemes without the zone name repeat labels across zones;
+            # like the client, the first zone owns a repeated label.
+            if label in self._slots:
+                shadowed |= 1 << slot
+                self.duplicate_labels.append(label)
+            else:
+                self._slots[label] = (zone_index, slot)
+        self.shadowed.append(shadowed)
+
+    def copy(self) -> "StorageOccupancy":
+        """Copy whose bitsets can be changed without touching this one; the layout is shared"""
+        clone = copy.copy(self)
+        clone.bits = list(self.bits)
+        return clone
+
+    def locate(self, position: str) -> Optional[Tuple[int, int]]:
+        """(zone index, slot) of a position label, or None if not in this storage"""
+        return self._slots.get(position)
+
+    def is_free(self, position: str) -> bool:
+        location = self.locate(position)
+        if location is None:
+            return False
+        zone_index, slot = location
+        return not (self.bits[zone_index] >> slot) & 1
+
+    def occupy(self, position: Optional[str]) -> None:
+        location = self.locate(position) if position else None
+        if location is not None:
+            zone_index, slot = location
+            self.bits[zone_index] |= 1 << slot
+
+    def vacate(self, position: Optional[str]) -> None:
+        location = self.locate(position) if position else None
+        if location is not None:
+            zone_index, slot = location
+            self.bits[zone_index] &= ~(1 << slot)
+
+    def zone_size(self, zone_index: int) -> int:
+        _, rows, columns = self.zones[zone_index]
+        return rows * columns
+
+    def zone_capacity(self, zone_index: int) -> int:
+        """Slots of a zone that a wine can be placed in"""
+        return self.zone_size(zone_index) - bin(self.shadowed[zone_index]).count("1")
+
+    def occupied_count(self, zone_index: int) -> int:
+        return bin(self.bits[zone_index]).count("1")
+
+    def free_slots(self, zone_index: int) -> List[int]:
+        """Free slot numbers of a zone, in order"""
+        size = self.zone_size(zone_index)
+        free = ~(self.bits[zone_index] | self.shadowed[zone_index]) & ((1 << size) - 1)
+        slots = []
+        while free:
+            lowest = free & -free
+            slots.append(lowest.bit_length() - 1)
+            free ^= lowest
+        return slots
+
+    def free_positions(self, zone_index: int) -> List[str]:
+        labels = self.labels[zone_index]
+        return [labels[slot] for slot in self.free_slots(zone_index)]
+
+    def grid(self, zone_index: int) -> List[List[bool]]:
+        """Zone layout as rows of booleans, True where a slot is occupied"""
+        _, rows, columns = self.zones[zone_index]
+        bits = self.bits[zone_index]
+        return [
+            [bool((bits >> (row * columns + column)) & 1) for column in range(columns)]
+            for row in range(rows)
+        ]
+
+def _positions_statement(storage_id: str):
+    return select(Wine.position).where(
+        Wine.storage_id == storage_id,
+        Wine.position.isnot(None)
+    )
+
+# (old storage, old position, new storage, new position) of a wine
+WineMove = Tuple[Optional[str], Optional[str], Optional[str], Optional[str]]
+
+class OccupancyIndex:
+    """
+    Process-wide cache of StorageOccupancy, loaded lazily per storage.
+
+    The entries reflect the wines table at one wines version (see
+    app.models.versions). Wine writes made through a session of this
+    process are applied to the bitsets in place once they commit, and
+    advance that version by exactly the bumps of their transaction, so
+    they cost no reload. A lookup that finds a newer version has seen
+    writes from another process or from raw SQL, and drops every entry.
+    Entries built for another layout of the storage are rebuilt too.
+    Entries are shared between requests; use StorageOccupancy.copy() for
+    a scratch copy.
+    """
+
+    def __init__(self):
+        self._storages: Dict[str, StorageOccupancy] = {}
+        self._version: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _cached(self, storage: Storage, wines_version: int) -> Optional[StorageOccupancy]:
+        with self._lock:
+            if self._version is None or self._version < wines_version:
+                self._storages.clear()
+                self._version = wines_version
+            if self._version != wines_version:
+                # Read before a write this process has already applied
+                return None
+            occupancy = self._storages.get(storage.id)
+        if occupancy is None or occupancy.layout != storage_layout(storage):
+            return None
+        return occupancy
+
+    def _store(self, storage: Storage, positions, wines_version: int) -> StorageOccupancy:
+        occupancy = StorageOccupancy(storage)
+        for position in positions:
+            occupancy.occupy(position)
+
+        with self._lock:
+            if self._version == wines_version:
+                self._storages[storage.id] = occupancy
+        return occupancy
+
+    async def get_async(self, db: AsyncSession, storage: Storage, wines_version: Optional[int] = None) -> StorageOccupancy:
+        """
+        Get a storage's occupancy, loading it on a miss
+
+        Args:
+            wines_version: Current wines version, if the caller has already
+                read it in this transaction
+        """
+        # The version is read before the positions: a write committed in
+        # between is either applied to the entry when it commits or makes
+        # the next lookup see a newer version
+        if wines_version is None:
+            wines_version = await get_version_async(db, "wines")
+        occupancy = self._cached(storage, wines_version)
+        if occupancy is not None:
+            return occupancy
+        result = await db.execute(_positions_statement(storage.id))
+        return self._store(storage, result.scalars(), wines_version)
+
+    def apply(self, start_version: int, end_version: int, moves: List[WineMove]) -> None:
+        """
+        Apply the wine moves of a committed transaction
+
+        Args:
+            start_version: Wines version before the transaction
+            end_version: Wines version it committed
+            moves: Position changes of the wines it wrote
+        """
+        with self._lock:
+            if self._version is not None and self._version >= end_version:
+                # A lookup already reloaded the entries after the commit
+                return
+            if self._version != start_version:
+                # Writes this process has not seen came before the transaction
+                self._storages.clear()
+                self._version = None
+                return
+            # Vacate before occupying so swaps within one commit end up occupied
+            for old_storage, old_position, _, _ in moves:
+                if old_storage in self._storages:
+                    self._storages[old_storage].vacate(old_position)
+            for _, _, new_storage, new_position in moves:
+                if new_storage in self._storages:
+                    self._storages[new_storage].occupy(new_position)
+            self._version = end_version
+
+    def invalidate(self, storage_id: Optional[str] = None) -> None:
+        """Drop one storage, or every storage if storage_id is None"""
+        with self._lock:
+            if storage_id is None:
+                self._storages.clear()
+            else:
+                self._storages.pop(storage_id, None)
+
+occupancy_index = OccupancyIndex()
+
+_WRITE_KEY = "occupancy_write"
+
+class _WineWrite:
+    """Wines version claimed by a transaction and the wine moves it made"""
+
+    def __init__(self, start_version: int):
+        self.start_version = start_version
+        self.end_version: Optional[int] = None
+        self.moves: List[WineMove] = []
+
+def _wine_write(session: Session) -> _WineWrite:
+    write = session.info.get(_WRITE_KEY)
+    if write is None:
+        write = session.info[_WRITE_KEY] = _WineWrite(claim_version(session.connection(), "wines"))
+    return write
+
+def _previous_value(wine: Wine, attribute: str):
+    history = inspect(wine).attrs[attribute].history
+    if history.deleted:
+        return history.deleted[0]
+    if history.unchanged:
+        return history.unchanged[0]
+    return None
+
+def _record_moves(session: Session, moves: List[WineMove]) -> None:
+    _wine_write(session).moves.extend(moves)
+
+async def record_wine_moves(db: AsyncSession, moves: List[WineMove]) -> None:
+    """
+    Record wine moves made with Core statements, which the flush hooks do
+    not see. Call before executing them, so the claim is the transaction's
+    first write.
+    """
+    await db.run_sync(_record_moves, moves)
+
+@event.listens_for(Session, "before_flush")
+def _claim_wines_version(session, flush_context, instances):
+    if any(isinstance(obj, Wine) for obj in (*session.new, *session.dirty, *session.deleted)):
+        _wine_write(session)
+
+@event.listens_for(Session, "after_flush")
+def _collect_wine_moves(session, flush_context):
+    write = session.info.get(_WRITE_KEY)
+    if write is None:
+        return
+
+    for obj in session.new:
+        if isinstance(obj, Wine):
+            write.moves.append((None, None, obj.storage_id, obj.position))
+    for obj in session.dirty:
+        if isinstance(obj, Wine):
+            old = (_previous_value(obj, "storage_id"), _previous_value(obj, "position"))
+            new = (obj.storage_id, obj.position)
+            if old != new:
+                write.moves.append((*old, *new))
+    for obj in session.deleted:
+        if isinstance(obj, Wine):
+            write.moves.append((_previous_value(obj, "storage_id"), _previous_value(obj, "position"), None, None))
+
+@event.listens_for(Session, "before_commit")
+def _read_committed_version(session):
+    # Flush first: commit flushes only after this hook, and the flush is
+    # what claims the version for pending wine changes
+    session.flush()
+    write = session.info.get(_WRITE_KEY)
+    if write is not None:
+        write.end_version = get_version(session, "wines")
+
+@event.listens_for(Session, "after_commit")
+def _apply_wine_moves(session):
+    write = session.info.pop(_WRITE_KEY, None)
+    if write is not None and write.end_version is not None:
+        occupancy_index.apply(write.start_version, write.end_version, write.moves)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_wine_moves(session):
+    session.info.pop(_WRITE_KEY, None)
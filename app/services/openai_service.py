@@ -1,13 +1,106 @@
-import os
+import asyncio
 import base64
-import requests
-from typing import Dict, Any
+import httpx
+from typing import Dict, Any, Optional
+from pydantic import ValidationError
 from app.config import settings
+from app.schemas.wine import LabelAnalysis
+from app.services.image_service import prepare_label_image
+from app.services.metadata_extractor import extract_fields
 
-def analyze_wine_label(image_path: str) -> Dict[str, Any]:
+# Shared HTTP client, so vision calls reuse pooled keep-alive connections.
+# httpx clients and asyncio semaphores belong to the event loop that created
+# them, so both are recreated if the running loop changes.
+_http_client: Optional[httpx.AsyncClient] = None
+_request_slots: Optional[asyncio.Semaphore] = None
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+def get_http_client() -> httpx.AsyncClient:
+    """Get the shared OpenAI HTTP client, creating it on first use"""
+    global _http_client, _request_slots, _client_loop
+    
+    loop = asyncio.get_running_loop()
+    if _http_client is None or _client_loop is not loop:
+        _http_client = httpx.AsyncClient(
+            base_url=settings.openai_base_url,
+            timeout=httpx.Timeout(
+                settings.openai_read_timeout,
+                connect=settings.openai_connect_timeout
+            ),
+            limits=httpx.Limits(
+                max_connections=settings.openai_max_connections,
+                max_keepalive_connections=settings.openai_max_connections
+            )
+        )
+        _request_slots = asyncio.Semaphore(settings.openai_max_concurrency)
+        _client_loop = loop
+    
+    return _http_client
+
+async def close_http_client() -> None:
+    """Close the shared HTTP client; call on application shutdown"""
+    global _http_client, _request_slots, _client_loop
+    
+    if _http_client is not None:
+        await _http_client.aclose()
+    _http_client = None
+    _request_slots = None
+    _client_loop = None
+
+# Bump when a prompt or the reply handling changes, so cached analyses
+# made with the previous version are not reused
+PROMPT_VERSION = 1
+
+def analysis_variant() -> str:
+    """The reply mode, prompt version and model the current settings analyze labels with"""
+    mode = "structured" if settings.openai_structured_output else "legacy"
+    return f"{mode}:v{PROMPT_VERSION}:{settings.openai_model}"
+
+STRUCTURED_PROMPT = (
+    "Please analyze this wine label. Reply with JSON only: the wine's name, producer, "
+    "vintage (the harvest year as a number, or null for non-vintage wines), type "
+    "(Red, White, Rosé, Sparkling, Dessert or Fortified), grape varietals, region and "
+    "country, and a comprehensive description of the wine. Use an empty string for "
+    "anything the label does not show."
+)
+
+# Chat completions response_format asking for JSON that matches LabelAnalysis
+LABEL_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "wine_label_analysis",
+        "strict": True,
+        "schema": LabelAnalysis.model_json_schema()
+    }
+}
+
+def parse_label_analysis(content: str) -> Optional[LabelAnalysis]:
+    """Validate a structured reply, or return None if it is not valid LabelAnalysis JSON"""
+    try:
+        return LabelAnalysis.model_validate_json(content)
+    except ValidationError:
+        return None
+
+def label_analysis_metadata(analysis: LabelAnalysis) -> Dict[str, Any]:
+    """wine_metadata for a structured reply, in the shape extract_wine_metadata returns"""
+    return {
+        "name": analysis.name.strip(),
+        "producer": analysis.producer.strip(),
+        "vintage": analysis.vintage,
+        "type": analysis.type.strip(),
+        "varietal": ", ".join(grape.strip() for grape in analysis.varietal if grape.strip()),
+        "region": analysis.region.strip(),
+        "country": analysis.country.strip()
+    }
+
+async def analyze_wine_label(image_path: str) -> Dict[str, Any]:
     """
     Analyze a wine label image using OpenAI Vision API.
     
+    With OPENAI_STRUCTURED_OUTPUT enabled the model is asked for JSON
+    matching LabelAnalysis. Replies that do not validate fall back to the
+    free-text metadata extractor.
+    
     Args:
         image_path: Path to the image file
         
@@ -23,17 +116,19 @@ def analyze_wine_label(image_path: str) -> Dict[str, Any]:
         }
     
     try:
-        # Read and encode the image
-        with open(image_path, "rb") as image_file:
-            base64_image = base64.b64encode(image_file.read()).decode('utf-8')
+        # Orient, downscale and re-encode the photo, then encode it for the request
+        image_bytes, mime_type = await prepare_label_image(image_path)
+        base64_image = base64.b64encode(image_bytes).decode('utf-8')
         
         headers = {
             "Content-Type": "application/json",
             "Authorization": f"Bearer {api_key}"
         }
         
+        structured = settings.openai_structured_output
+        
         payload = {
-            "model": "gpt-4-vision-preview",
+            "model": settings.openai_model,
             "messages": [
                 {
                     "role": "system",
@@ -44,12 +139,12 @@ def analyze_wine_label(image_path: str) -> Dict[str, Any]:
                     "content": [
                         {
                             "type": "text", 
-                            "text": "Please analyze this wine label and provide information about the wine. Extract as much detail as possible including name, producer, vintage, type, varietal, region, and any other relevant information."
+                            "text": STRUCTURED_PROMPT if structured else "Please analyze this wine label and provide information about the wine. Extract as much detail as possible including name, producer, vintage, type, varietal, region, and any other relevant information."
                         },
                         {
                             "type": "image_url",
                             "image_url": {
-                                "url": f"data:image/jpeg;base64,{base64_image}"
+                                "url": f"data:{mime_type};base64,{base64_image}"
                             }
                         }
                     ]
@@ -57,20 +152,33 @@ def analyze_wine_label(image_path: str) -> Dict[str, Any]:
             ],
             "max_tokens": 800
         }
+        if structured:
+            payload["response_format"] = LABEL_RESPONSE_FORMAT
+        
+        client = get_http_client()
         
-        response = requests.post("https://api.openai.com/v1/chat/completions", headers=headers, json=payload)
+        # Bound the number of in-flight vision calls; excess scans wait here
+        async with _request_slots:
+            response = await client.post("/chat/completions", headers=headers, json=payload)
         response.raise_for_status()
         
         result = response.json()
-        description = result["choices"][0]["message"]["content"]
+        content = result["choices"][0]["message"]["content"]
         
-        # Extract key metadata from the description
-        wine_metadata = extract_wine_metadata(description)
+        analysis = parse_label_analysis(content) if structured else None
+        if analysis is not None:
+            description = analysis.description
+            wine_metadata = label_analysis_metadata(analysis)
+        else:
+            # Free-text reply, or JSON that did not validate: fall back to the extractor
+            description = content
+            wine_metadata = extract_wine_metadata(content)
         
         return {
             "success": True,
             "description": description,
-            "wine_metadata": wine_metadata
+            "wine_metadata": wine_metadata,
+            "structured": analysis is not None
         }
         
     except Exception as e:
@@ -82,8 +190,6 @@ def analyze_wine_label(image_path: str) -> Dict[str, Any]:
 def extract_wine_metadata(description: str) -> Dict[str, Any]:
     """
     Extract structured metadata from the wine description.
-    This is a simple implementation - in production, you might want to use
-    a more sophisticated approach or even another API call.
     
     Args:
         description: The wine description from OpenAI
@@ -91,49 +197,14 @@ def extract_wine_metadata(description: str) -> Dict[str, Any]:
     Returns:
         Dict with structured wine metadata
     """
-    import re
+    fields = extract_fields(description)
     
-    metadata = {
-        "name": "",
-        "producer": "",
-        "vintage": None,
-        "type": "",
-        "varietal": "",
-        "region": "",
-        "country": ""
+    return {
+        "name": fields["name"],
+        "producer": fields["producer"],
+        "vintage": fields["vintage"],
+        "type": fields["type"],
+        "varietal": ", ".join(fields["varietal"]),
+        "region": fields["region"],
+        "country": fields["country"]
     }
-    
-    # Extract vintage (4-digit year)
-    vintage_match = re.search(r'\b(19|20)\d{2}\b', description)
-    if vintage_match:
-        try:
-            metadata["vintage"] = int(vintage_match.group(0))
-        except ValueError:
-            pass
-    
-    # Extract wine type
-    type_patterns = [
-        r'(?:Type|Wine Type|Style):\s*(Red|White|Rosé|Sparkling|Dessert)',
-        r'(?:Type|Wine Type|Style):\s*([^,\n.]+)'
-    ]
-    
-    for pattern in type_patterns:
-        match = re.search(pattern, description, re.IGNORECASE)
-        if match:
-            metadata["type"] = match.group(1).strip()
-            break
-    
-    # Extract other fields - this is simplified and would be more robust in production
-    for field in ["name", "producer", "varietal", "region", "country"]:
-        patterns = [
-            rf'(?:{field.title()}):\s*([^,\n.]+)',
-            rf'(?:{field.title()}):\s*([^\n]+)'
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, description, re.IGNORECASE)
-            if match:
-                metadata[field] = match.group(1).strip()
-                break
-    
-    return metadata
\ No newline at end of file
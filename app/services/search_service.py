@@ -0,0 +1,110 @@
+import html
+import re
+from typing import List, Optional
+from sqlalchemy import String, false, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.wine import Wine
+
+# Column weights for bm25 ranking: wine_id, name, description, metadata
+_BM25_WEIGHTS = "0.0, 10.0, 1.0, 4.0"
+
+# Control characters wrapping matches in snippets; replaced by <mark> tags
+# after the rest of the snippet has been HTML-escaped
+_HIGHLIGHT_START = "\x02"
+_HIGHLIGHT_END = "\x03"
+
+_TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+def build_match_query(query: str) -> Optional[str]:
+    """
+    Turn free text into an FTS5 MATCH expression
+
+    Every word must match, and the last word matches as a prefix so
+    results appear while the user is still typing. Words are quoted so
+    FTS5 operators in user input are treated as plain text.
+
+    Returns:
+        The MATCH expression, or None if the query contains no words
+    """
+    tokens = _TOKEN_PATTERN.findall(query)
+    if not tokens:
+        return None
+
+    terms = [f'"{token}"' for token in tokens[:-1]]
+    terms.append(f'"{tokens[-1]}"*')
+    return " ".join(terms)
+
+def _render_snippet(snippet: Optional[str]) -> Optional[str]:
+    if snippet is None:
+        return None
+    escaped = html.escape(snippet)
+    return escaped.replace(_HIGHLIGHT_START, "<mark>").replace(_HIGHLIGHT_END, "</mark>")
+
+def match_filter(query: str):
+    """
+    SQL clause restricting Wine rows to full-text matches of query
+
+    A query without any words matches nothing.
+    """
+    match = build_match_query(query)
+    if not match:
+        return false()
+    return Wine.id.in_(
+        text("SELECT wine_id FROM wines_fts WHERE wines_fts MATCH :match")
+        .bindparams(match=match)
+        .columns(wine_id=String)
+    )
+
+def _ranked_statement(match: str, limit: int, storage_id: Optional[str]):
+    sql = f"""
+        SELECT f.wine_id,
+               snippet(wines_fts, -1, :hl_start, :hl_end, '…', 12) AS snippet,
+               bm25(wines_fts, {_BM25_WEIGHTS}) AS rank
+        FROM wines_fts AS f
+        {"JOIN wines AS w ON w.id = f.wine_id" if storage_id else ""}
+        WHERE wines_fts MATCH :match
+        {"AND w.storage_id = :storage_id" if storage_id else ""}
+        ORDER BY rank
+        LIMIT :limit
+    """
+    return text(sql).bindparams(
+        hl_start=_HIGHLIGHT_START,
+        hl_end=_HIGHLIGHT_END,
+        match=match,
+        limit=limit,
+        **({"storage_id": storage_id} if storage_id else {})
+    )
+
+def _results(rows, wines: List[Wine]) -> List[dict]:
+    by_id = {wine.id: wine for wine in wines}
+    return [
+        {"wine": by_id[row.wine_id], "snippet": _render_snippet(row.snippet), "rank": row.rank}
+        for row in rows
+        if row.wine_id in by_id
+    ]
+
+class AsyncSearchService:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def search(self, query: str, limit: int = 20, storage_id: Optional[str] = None) -> List[dict]:
+        """
+        Rank wines against a free-text query
+
+        Returns:
+            List of dicts with the wine, an HTML snippet with <mark>-highlighted
+            matches, and the bm25 rank (lower is better)
+        """
+        match = build_match_query(query)
+        if not match:
+            return []
+
+        rows = (await self.db.execute(_ranked_statement(match, limit, storage_id))).all()
+        if not rows:
+            return []
+
+        wines = (await self.db.execute(
+            select(Wine).where(Wine.id.in_([row.wine_id for row in rows]))
+        )).scalars().all()
+        return _results(rows, wines)
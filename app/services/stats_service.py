@@ -0,0 +1,163 @@
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.storage import Storage
+from app.models.versions import get_versions_async
+from app.models.wine import Wine, METADATA_COLUMNS
+from app.services.occupancy_service import StorageOccupancy
+
+# (wines version, storages version) the statistics were computed at
+StatsVersion = Tuple[int, int]
+
+def _count_by_field(field: str):
+    column = METADATA_COLUMNS[field]
+    return select(column, func.count()).group_by(column).order_by(func.count().desc(), column)
+
+def _count_by_vintage():
+    # Grouped by vintage rather than decade so the scan stays on the vintage
+    # index; there are only as many rows as distinct vintages to fold
+    return select(Wine.vintage, func.count()).group_by(Wine.vintage)
+
+def _count_by_storage():
+    return select(Wine.storage_id, func.count()).group_by(Wine.storage_id)
+
+def _count_by_position():
+    # Covered by the partial unique index on (storage_id, position); positions
+    # are mapped to zones in Python, since zones are not a column
+    return (
+        select(Wine.storage_id, Wine.position, func.count())
+        .where(Wine.storage_id.isnot(None), Wine.position.isnot(None))
+        .group_by(Wine.storage_id, Wine.position)
+    )
+
+def _storages_statement():
+    return select(Storage).order_by(Storage.name, Storage.id)
+
+def _fill_rate(occupied: int, capacity: int) -> float:
+    return round(occupied / capacity, 4) if capacity else 0.0
+
+def _value_counts(rows) -> List[Dict[str, Any]]:
+    return [{"value": None if value is None else str(value), "count": count} for value, count in rows]
+
+def _decade_counts(rows) -> List[Dict[str, Any]]:
+    decades: Dict[Optional[int], int] = {}
+    for vintage, count in rows:
+        # Like the filter options, only integer vintages count
+        decade = vintage - vintage % 10 if isinstance(vintage, int) else None
+        decades[decade] = decades.get(decade, 0) + count
+    return [
+        {"decade": decade, "count": count}
+        for decade, count in sorted(decades.items(), key=lambda item: (item[0] is None, item[0] or 0))
+    ]
+
+def _storage_stats(storage: Storage, wines: int, positions: Dict[str, int]) -> Dict[str, Any]:
+    """
+    Statistics of one storage from its wine count and its wines per position
+
+    The layout only maps positions to zones, so zone counts come from the
+    same query as the storage's occupied count and always add up to it,
+    apart from positions outside the current layout.
+    """
+    layout = StorageOccupancy(storage)
+    by_zone = [0] * len(layout.zones)
+    for position, count in positions.items():
+        location = layout.locate(position)
+        if location is not None:
+            by_zone[location[0]] += count
+
+    zones = []
+    for zone_index, (name, _, _) in enumerate(layout.zones):
+        capacity = layout.zone_capacity(zone_index)
+        zone_occupied = by_zone[zone_index]
+        zones.append({
+            "name": name,
+            "capacity": capacity,
+            "occupied": zone_occupied,
+            "fill_rate": _fill_rate(zone_occupied, capacity)
+        })
+
+    occupied = sum(positions.values())
+    return {
+        "id": storage.id,
+        "name": storage.name,
+        "type": storage.type,
+        "total_positions": storage.total_positions,
+        "wines": wines,
+        "occupied": occupied,
+        "fill_rate": _fill_rate(occupied, storage.total_positions),
+        "zones": zones
+    }
+
+def _collection_stats(by_type, by_country, by_vintage, by_storage: Dict, storages: List[Dict]) -> Dict[str, Any]:
+    return {
+        "total_wines": sum(by_storage.values()),
+        "by_type": _value_counts(by_type),
+        "by_country": _value_counts(by_country),
+        "by_vintage_decade": _decade_counts(by_vintage),
+        "storages": storages
+    }
+
+class StatsCache:
+    """
+    The most recent collection statistics, with the versions they were computed at.
+
+    Any write to wines or storages bumps a version, so a cached result is
+    current exactly when its versions match the database's.
+    """
+
+    def __init__(self):
+        self._entry: Optional[Tuple[StatsVersion, Dict[str, Any]]] = None
+        self._lock = threading.Lock()
+
+    def get(self, version: StatsVersion) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            if self._entry is not None and self._entry[0] == version:
+                return self._entry[1]
+        return None
+
+    def put(self, version: StatsVersion, stats: Dict[str, Any]) -> None:
+        with self._lock:
+            self._entry = (version, stats)
+
+stats_cache = StatsCache()
+
+class AsyncStatsService:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_version(self) -> StatsVersion:
+        """Versions of the tables the statistics are computed from"""
+        versions = await get_versions_async(self.db)
+        return versions["wines"], versions["storages"]
+
+    async def get_stats(self, version: Optional[StatsVersion] = None) -> Dict[str, Any]:
+        """
+        Get wine counts by type, country, vintage decade, storage and zone
+
+        Counts are computed with GROUP BY queries over indexed columns and
+        cached until the wines or storages change.
+        """
+        version = version or await self.get_version()
+        stats = stats_cache.get(version)
+        if stats is not None:
+            return stats
+
+        by_storage = dict((await self.db.execute(_count_by_storage())).all())
+        positions: Dict[str, Dict[str, int]] = {}
+        for storage_id, position, count in (await self.db.execute(_count_by_position())).all():
+            positions.setdefault(storage_id, {})[position] = count
+        storages = [
+            _storage_stats(storage, by_storage.get(storage.id, 0), positions.get(storage.id, {}))
+            for storage in (await self.db.execute(_storages_statement())).scalars().all()
+        ]
+        stats = _collection_stats(
+            (await self.db.execute(_count_by_field("type"))).all(),
+            (await self.db.execute(_count_by_field("country"))).all(),
+            (await self.db.execute(_count_by_vintage())).all(),
+            by_storage, storages
+        )
+
+        stats_cache.put(version, stats)
+        return stats
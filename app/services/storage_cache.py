@@ -0,0 +1,94 @@
+import copy
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.storage import Storage
+from app.models.versions import get_version_async
+
+@dataclass(frozen=True)
+class StorageSnapshot:
+    """
+    Read-only copy of a storage configuration, detached from any session.
+
+    Has the same attributes as Storage apart from its wines, so it can be
+    used wherever a storage layout is only read (position checks,
+    occupancy, responses).
+    """
+    id: str
+    name: str
+    type: str
+    zones: List[Dict[str, Any]]
+    total_positions: int
+    position_naming_scheme: str
+    # storages version the snapshot was loaded at
+    version: int = 0
+
+    @classmethod
+    def of(cls, storage: Storage, version: int = 0) -> "StorageSnapshot":
+        return cls(
+            id=storage.id,
+            name=storage.name,
+            type=storage.type,
+            zones=copy.deepcopy(storage.zones),
+            total_positions=storage.total_positions,
+            position_naming_scheme=storage.position_naming_scheme,
+            version=version
+        )
+
+class StorageCache:
+    """
+    Process-wide read-through cache of storage configurations by id.
+
+    Each snapshot records the storages version it was loaded at, and a
+    lookup only returns it while that is still the current version, so
+    writes by any process are seen at once and a slow reader cannot put
+    back a configuration a concurrent writer just replaced. Writes through
+    AsyncStorageService also drop the entry they change.
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, StorageSnapshot] = {}
+        self._lock = threading.Lock()
+
+    def _lookup(self, storage_id: str, version: int) -> Optional[StorageSnapshot]:
+        with self._lock:
+            snapshot = self._entries.get(storage_id)
+        return snapshot if snapshot is not None and snapshot.version == version else None
+
+    def _store(self, storage: Optional[Storage], version: int) -> Optional[StorageSnapshot]:
+        if storage is None:
+            return None
+
+        snapshot = StorageSnapshot.of(storage, version)
+        with self._lock:
+            current = self._entries.get(storage.id)
+            if current is None or current.version <= version:
+                self._entries[storage.id] = snapshot
+        return snapshot
+
+    async def get_async(self, db: AsyncSession, storage_id: str, version: Optional[int] = None) -> Optional[StorageSnapshot]:
+        """
+        Get a storage configuration, loading it on a miss; None if it does not exist
+
+        Args:
+            version: Current storages version, if the caller has already
+                read it in this transaction (e.g. for an ETag)
+        """
+        if version is None:
+            version = await get_version_async(db, "storages")
+        snapshot = self._lookup(storage_id, version)
+        if snapshot is not None:
+            return snapshot
+        return self._store(await db.get(Storage, storage_id), version)
+
+    def invalidate(self, storage_id: Optional[str] = None) -> None:
+        """Drop one storage, or every storage if storage_id is None"""
+        with self._lock:
+            if storage_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(storage_id, None)
+
+storage_cache = StorageCache()
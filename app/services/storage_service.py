@@ -1,121 +1,375 @@
-from typing import List, Optional, Dict
-from sqlalchemy.orm import Session
+from typing import List, Optional, Dict, Tuple
+from sqlalchemy import literal, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException, status
 
 from app.models.storage import Storage
+from app.models.versions import get_versions_async
 from app.models.wine import Wine
-from app.schemas.storage import StorageCreate, StorageUpdate
+from app.schemas.storage import StorageCreate, StorageUpdate, RelocationMove
+from app.services.occupancy_service import occupancy_index, StorageOccupancy
+from app.services.storage_cache import storage_cache, StorageSnapshot
+from app.utils.pagination import apply_keyset, finish_page, DEFAULT_PAGE_SIZE
 
-class StorageService:
-    def __init__(self, db: Session):
+def _storage_not_found() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail="Storage configuration not found"
+    )
+
+def _total_positions(zones: List[Dict]) -> int:
+    """Calculate total positions by multiplying each zone's dimensions"""
+    total_positions = 0
+    for zone in zones:
+        zone_positions = 1
+        for dimension_value in zone["dimensions"].values():
+            zone_positions *= dimension_value
+        total_positions += zone_positions
+    return total_positions
+
+def _check_layout(storage: Storage) -> None:
+    """
+    Reject layouts in which two zones produce the same position label
+    
+    Row-Column and Sequential Numbering labels do not include the zone
+    name, so a second zone would repeat the first zone's labels and its
+    slots could never be addressed.
+    """
+    duplicates = StorageOccupancy(storage).duplicate_labels
+    if duplicates:
+        shown = ", ".join(duplicates[:5]) + (", ..." if len(duplicates) > 5 else "")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Zones produce duplicate positions ({shown}); use a naming scheme that includes the zone name"
+        )
+
+def _new_storage(storage_data: StorageCreate) -> Storage:
+    zones = [zone.model_dump() for zone in storage_data.zones]
+    return Storage(
+        name=storage_data.name,
+        type=storage_data.type,
+        zones=zones,
+        total_positions=_total_positions(zones),
+        position_naming_scheme=storage_data.position_naming_scheme
+    )
+
+def _apply_update(db_storage: Storage, storage_data: StorageUpdate) -> None:
+    # Update fields if provided
+    update_data = storage_data.model_dump(exclude_unset=True)
+    
+    # If zones are updated, recalculate total positions
+    if "zones" in update_data:
+        update_data["total_positions"] = _total_positions(update_data["zones"])
+    
+    for key, value in update_data.items():
+        setattr(db_storage, key, value)
+
+def _storages_page_statement(cursor: Optional[str], limit: int):
+    # Storages carry no creation timestamp, so the primary key alone
+    # serves as the keyset
+    return apply_keyset(
+        select(Storage),
+        sort_column=Storage.id,
+        id_column=Storage.id,
+        cursor=cursor,
+        limit=limit
+    )
+
+def _check_in_layout(occupancy: StorageOccupancy, position: str) -> None:
+    if occupancy.locate(position) is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid position for this storage"
+        )
+
+def _position_taken_statement(storage_id: str, position: str):
+    # Answered from the unique (storage_id, position) index
+    return select(literal(1)).where(Wine.storage_id == storage_id, Wine.position == position).limit(1)
+
+def _occupancy_report(storage: Storage, occupancy: StorageOccupancy) -> Dict:
+    zones = []
+    for zone_index, (name, rows, columns) in enumerate(occupancy.zones):
+        zones.append({
+            "name": name,
+            "rows": rows,
+            "columns": columns,
+            "occupied": occupancy.occupied_count(zone_index),
+            "free_positions": occupancy.free_positions(zone_index),
+            "grid": occupancy.grid(zone_index)
+        })
+    
+    occupied = sum(zone["occupied"] for zone in zones)
+    return {
+        "storage_id": storage.id,
+        "total_positions": storage.total_positions,
+        "occupied": occupied,
+        "free": sum(len(zone["free_positions"]) for zone in zones),
+        "free_positions": [position for zone in zones for position in zone["free_positions"]],
+        "zones": zones
+    }
+
+def _check_relocation_moves(moves: List[RelocationMove]) -> None:
+    wine_ids = [move.wine_id for move in moves]
+    if len(set(wine_ids)) != len(wine_ids):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Each wine can only be moved once per relocation"
+        )
+
+def _plan_relocation(storage: Storage, occupancy: StorageOccupancy, moves: List[RelocationMove], wines: Dict[str, Wine]) -> List[str]:
+    """
+    Validate the state after a set of moves, all at once
+    
+    Works on a copy of the occupancy bitsets: the moved wines' current slots
+    in this storage are vacated first, so swaps and rotations among them are
+    valid as long as the final state has one bottle per slot.
+    
+    Returns:
+        Target positions the bitsets report as taken by wines that are not
+        being moved, to be confirmed against the database
+    
+    Raises:
+        HTTPException: 404 for unknown wines, 400 for positions outside the
+            layout, 409 for slots targeted by more than one move
+    """
+    missing = [move.wine_id for move in moves if move.wine_id not in wines]
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Wines not found: {', '.join(missing)}"
+        )
+    
+    invalid = [move.position for move in moves if move.position and occupancy.locate(move.position) is None]
+    if invalid:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid positions for this storage: {', '.join(invalid)}"
+        )
+    
+    final = occupancy.copy()
+    for move in moves:
+        wine = wines[move.wine_id]
+        if wine.storage_id == storage.id:
+            final.vacate(wine.position)
+    
+    targets = set()
+    conflicts = []
+    taken = []
+    for move in moves:
+        if not move.position:
+            continue
+        if move.position in targets:
+            conflicts.append(move.position)
+        elif final.is_free(move.position):
+            final.occupy(move.position)
+        else:
+            taken.append(move.position)
+        targets.add(move.position)
+    if conflicts:
+        raise _positions_occupied(conflicts)
+    return taken
+
+def _positions_occupied(positions: List[str]) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail=f"Positions already occupied: {', '.join(positions)}"
+    )
+
+def _occupied_positions_statement(storage_id: str, positions: List[str], moved_ids: List[str]):
+    return select(Wine.position).where(
+        Wine.storage_id == storage_id,
+        Wine.position.in_(positions),
+        Wine.id.notin_(moved_ids)
+    )
+
+def _relocated(moves: List[RelocationMove], wines: Dict[str, Wine]) -> List[Dict]:
+    return [
+        {
+            "wine_id": move.wine_id,
+            "from_storage_id": wines[move.wine_id].storage_id,
+            "from_position": wines[move.wine_id].position,
+            "position": move.position
+        }
+        for move in moves
+    ]
+
+def _release_positions(moves: List[RelocationMove], wines: Dict[str, Wine]) -> None:
+    # Take every moved bottle out first so the unique (storage_id, position)
+    # index never sees two bottles in one slot halfway through a swap
+    for move in moves:
+        wines[move.wine_id].position = None
+
+def _assign_positions(storage: Storage, moves: List[RelocationMove], wines: Dict[str, Wine]) -> None:
+    for move in moves:
+        wine = wines[move.wine_id]
+        wine.storage_id = storage.id
+        wine.position = move.position
+
+def _relocation_conflict() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail="Position already occupied"
+    )
+
+class AsyncStorageService:
+    def __init__(self, db: AsyncSession):
         self.db = db
     
-    def get_all_storages(self) -> List[Storage]:
-        """Get all storage configurations"""
-        return self.db.query(Storage).all()
+    async def get_storages_page(self, cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE) -> Tuple[List[Storage], Optional[str]]:
+        """
+        Get one page of storage configurations ordered by ID
+        
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        storages = (await self.db.execute(_storages_page_statement(cursor, limit))).scalars().all()
+        return finish_page(storages, limit, lambda storage: storage.id)
     
-    def get_storage_by_id(self, storage_id: str) -> Optional[Storage]:
+    async def get_storage_by_id(self, storage_id: str) -> Optional[Storage]:
         """Get a storage configuration by ID"""
-        return self.db.query(Storage).filter(Storage.id == storage_id).first()
+        return await self.db.get(Storage, storage_id)
     
-    def create_storage(self, storage_data: StorageCreate) -> Storage:
+    async def get_storage_layout(self, storage_id: str, version: Optional[int] = None) -> Optional[StorageSnapshot]:
+        """
+        Get a read-only storage configuration by ID from the storage cache
+        
+        Use for reads and validation; writes need get_storage_by_id. Pass
+        the storages version when it has already been read, so the snapshot
+        matches it.
+        """
+        return await storage_cache.get_async(self.db, storage_id, version)
+    
+    async def create_storage(self, storage_data: StorageCreate) -> Storage:
         """Create a new storage configuration"""
-        # Calculate total positions
-        total_positions = 0
-        for zone in storage_data.zones:
-            zone_positions = 1
-            for dimension_value in zone.dimensions.values():
-                zone_positions *= dimension_value
-            total_positions += zone_positions
-        
-        # Create storage object
-        db_storage = Storage(
-            name=storage_data.name,
-            type=storage_data.type,
-            zones=[zone.model_dump() for zone in storage_data.zones],
-            total_positions=total_positions,
-            position_naming_scheme=storage_data.position_naming_scheme
-        )
+        db_storage = _new_storage(storage_data)
+        _check_layout(db_storage)
         
         self.db.add(db_storage)
-        self.db.commit()
-        self.db.refresh(db_storage)
+        await self.db.commit()
+        storage_cache.invalidate(db_storage.id)
+        await self.db.refresh(db_storage)
         
         return db_storage
     
-    def update_storage(self, storage_id: str, storage_data: StorageUpdate) -> Storage:
+    async def update_storage(self, storage_id: str, storage_data: StorageUpdate) -> Storage:
         """Update a storage configuration"""
-        db_storage = self.get_storage_by_id(storage_id)
+        db_storage = await self.get_storage_by_id(storage_id)
         
         if not db_storage:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Storage configuration not found"
-            )
+            raise _storage_not_found()
         
-        # Update fields if provided
-        update_data = storage_data.model_dump(exclude_unset=True)
+        _apply_update(db_storage, storage_data)
+        # Existing layouts may predate the check; only a layout change is validated
+        if storage_data.model_fields_set & {"zones", "position_naming_scheme"}:
+            _check_layout(db_storage)
         
-        # If zones are updated, recalculate total positions
-        if "zones" in update_data:
-            total_positions = 0
-            for zone in update_data["zones"]:
-                zone_positions = 1
-                for dimension_value in zone["dimensions"].values():
-                    zone_positions *= dimension_value
-                total_positions += zone_positions
-            
-            update_data["total_positions"] = total_positions
-        
-        for key, value in update_data.items():
-            setattr(db_storage, key, value)
-        
-        self.db.commit()
-        self.db.refresh(db_storage)
+        await self.db.commit()
+        storage_cache.invalidate(storage_id)
+        await self.db.refresh(db_storage)
         
         return db_storage
     
-    def delete_storage(self, storage_id: str) -> bool:
+    async def delete_storage(self, storage_id: str) -> bool:
         """Delete a storage configuration"""
-        db_storage = self.get_storage_by_id(storage_id)
+        db_storage = await self.get_storage_by_id(storage_id)
         
         if not db_storage:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Storage configuration not found"
-            )
+            raise _storage_not_found()
         
-        self.db.delete(db_storage)
-        self.db.commit()
+        await self.db.delete(db_storage)
+        await self.db.commit()
+        storage_cache.invalidate(storage_id)
+        occupancy_index.invalidate(storage_id)
         
         return True
     
-    def validate_position(self, storage_id: str, position: str) -> bool:
+    async def check_position(self, storage: Storage, position: Optional[str], wines_version: Optional[int] = None) -> None:
         """
-        Validate if a position is valid for a given storage
-        
-        Args:
-            storage_id: The ID of the storage
-            position: The position string (e.g., "A3", "Red Zone-B2")
-            
-        Returns:
-            bool: True if the position is valid, False otherwise
+        Check a position against the storage layout and occupancy
+        
+        The occupancy bitsets answer most checks; a slot they report as
+        taken is confirmed with an indexed lookup before refusing it. The
+        unique index on (storage_id, position) remains the final guard
+        against concurrent placements. Pass the wines version when it has
+        already been read.
+        
+        Raises:
+            HTTPException: 400 if the position is not in the layout,
+                409 if it is already occupied
         """
-        storage = self.get_storage_by_id(storage_id)
+        if not position:
+            return
+        
+        occupancy = await occupancy_index.get_async(self.db, storage, wines_version)
+        _check_in_layout(occupancy, position)
+        if occupancy.is_free(position):
+            return
+        
+        taken = (await self.db.execute(_position_taken_statement(storage.id, position))).first()
+        if taken is not None:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Position already occupied"
+            )
+    
+    async def get_occupancy(self, storage_id: str) -> Dict:
+        """
+        Get occupied and free positions of a storage, zone by zone
+        
+        Raises:
+            HTTPException: If the storage does not exist
+        """
+        versions = await get_versions_async(self.db)
+        storage = await self.get_storage_layout(storage_id, versions["storages"])
+        
         if not storage:
-            return False
+            raise _storage_not_found()
         
-        # Empty position is considered valid (wine has no specific position)
-        if not position:
-            return True
+        occupancy = await occupancy_index.get_async(self.db, storage, versions["wines"])
+        return _occupancy_report(storage, occupancy)
+    
+    async def relocate(self, storage_id: str, moves: List[RelocationMove]) -> Dict:
+        """
+        Move wines to new positions in a storage, in a single transaction
+        
+        The final state is validated once against the cached occupancy, so
+        swaps and rotations are allowed; slots it reports as taken are
+        confirmed with the database. Wines from other storages are moved
+        into this one.
+        
+        Raises:
+            HTTPException: 404 if the storage or a wine does not exist,
+                400 for invalid moves, 409 if a slot would hold two bottles
+        """
+        _check_relocation_moves(moves)
+        versions = await get_versions_async(self.db)
+        storage = await self.get_storage_layout(storage_id, versions["storages"])
+        
+        if not storage:
+            raise _storage_not_found()
         
-        # For simplicity, we'll just check if the position is already occupied
-        existing_wine = self.db.query(Wine).filter(
-            Wine.storage_id == storage_id,
-            Wine.position == position
-        ).first()
+        wine_ids = [move.wine_id for move in moves]
+        result = await self.db.execute(select(Wine).where(Wine.id.in_(wine_ids)))
+        wines = {wine.id: wine for wine in result.scalars()}
+        occupancy = await occupancy_index.get_async(self.db, storage, versions["wines"])
+        taken = _plan_relocation(storage, occupancy, moves, wines)
+        if taken:
+            # The bitsets may lag behind the table; only refuse slots it confirms
+            result = await self.db.execute(_occupied_positions_statement(storage.id, taken, wine_ids))
+            occupied = set(result.scalars())
+            if occupied:
+                raise _positions_occupied([position for position in taken if position in occupied])
+        relocated = _relocated(moves, wines)
         
-        if existing_wine:
-            return False
+        try:
+            _release_positions(moves, wines)
+            await self.db.flush()
+            _assign_positions(storage, moves, wines)
+            await self.db.commit()
+        except IntegrityError:
+            # A concurrent write took one of the slots
+            await self.db.rollback()
+            raise _relocation_conflict()
         
-        return
\ No newline at end of file
+        return {"storage_id": storage.id, "moved": len(relocated), "wines": relocated}
@@ -0,0 +1,69 @@
+import asyncio
+import os
+import uuid
+from functools import partial
+from typing import Optional
+from PIL import Image, ImageOps
+
+from app.config import settings
+from app.services.image_service import get_image_executor
+from app.utils.thumbnails import THUMBNAIL_SIZES
+
+# Label images are stored under unique names and never rewritten, so their
+# derivatives can be cached by browsers indefinitely
+THUMBNAIL_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+def thumbnail_path(filename: str, size: int) -> str:
+    stem = os.path.splitext(filename)[0]
+    return os.path.join(settings.thumbnail_dir, str(size), f"{stem}.webp")
+
+def render_thumbnail(source_path: str, destination_path: str, size: int) -> None:
+    """
+    Write a WebP thumbnail whose longest edge is at most size
+
+    Runs in a worker process. The file is written under a temporary name and
+    renamed into place, so concurrent renders never expose a partial file.
+    """
+    os.makedirs(os.path.dirname(destination_path), exist_ok=True)
+    temporary_path = f"{destination_path}.{uuid.uuid4().hex}.tmp"
+
+    with Image.open(source_path) as image:
+        image.draft("RGB", (size, size))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((size, size), Image.LANCZOS)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGB")
+        image.save(temporary_path, format="WEBP", quality=80, method=4)
+
+    os.replace(temporary_path, destination_path)
+
+async def get_thumbnail(filename: str, size: int) -> Optional[str]:
+    """
+    Path of a label image thumbnail, rendering it on first request
+
+    Returns:
+        The thumbnail path, or None if the size is not offered or the
+        source image does not exist
+    """
+    if size not in THUMBNAIL_SIZES or filename != os.path.basename(filename):
+        return None
+
+    destination_path = thumbnail_path(filename, size)
+    if os.path.exists(destination_path):
+        return destination_path
+
+    source_path = os.path.join(settings.upload_dir, filename)
+    if not os.path.isfile(source_path):
+        return None
+
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(
+        get_image_executor(),
+        partial(render_thumbnail, source_path, destination_path, size)
+    )
+    return destination_path
+
+async def generate_thumbnails(filename: str) -> None:
+    """Render every thumbnail variant of a newly uploaded label image"""
+    for size in THUMBNAIL_SIZES:
+        await get_thumbnail(filename, size)
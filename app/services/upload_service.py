@@ -0,0 +1,129 @@
+import os
+import uuid
+import hashlib
+import aiofiles
+import aiofiles.os
+from dataclasses import dataclass
+from typing import Optional
+from fastapi import HTTPException, UploadFile, status
+
+from app.config import settings
+
+# Leading bytes of the image formats a phone or browser may upload
+_IMAGE_SIGNATURES = (
+    (b"\xff\xd8\xff", "image/jpeg", ".jpg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png", ".png"),
+    (b"GIF87a", "image/gif", ".gif"),
+    (b"GIF89a", "image/gif", ".gif"),
+)
+_HEIF_BRANDS = {b"heic", b"heix", b"hevc", b"mif1", b"msf1"}
+
+def sniff_image_type(head: bytes) -> Optional[tuple]:
+    """
+    Detect an image format from the first bytes of a file
+
+    Returns:
+        (mime type, file extension), or None if the bytes are not an image
+    """
+    for signature, mime_type, extension in _IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return mime_type, extension
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp", ".webp"
+    if head[4:8] == b"ftyp" and head[8:12] in _HEIF_BRANDS:
+        return "image/heic", ".heic"
+    return None
+
+@dataclass
+class SpooledUpload:
+    """An upload written to disk, with its content hash"""
+    path: str
+    sha256: str
+    size: int
+    content_type: str
+
+    @property
+    def filename(self) -> str:
+        return os.path.basename(self.path)
+
+    async def discard(self) -> None:
+        """Remove the spooled file, if it still exists"""
+        try:
+            await aiofiles.os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+def _too_large() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"Image exceeds the {settings.max_upload_bytes} byte upload limit"
+    )
+
+def _not_an_image() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+        detail="Upload is not a supported image (JPEG, PNG, GIF, WebP or HEIC)"
+    )
+
+async def spool_image_upload(
+    file: UploadFile,
+    directory: Optional[str] = None,
+    max_bytes: Optional[int] = None,
+    chunk_bytes: Optional[int] = None
+) -> SpooledUpload:
+    """
+    Stream an uploaded image to a uniquely named file, hashing it on the way
+
+    Only one chunk is held in memory at a time. Uploads are rejected as soon
+    as they are known to be too large (from the declared size, or once the
+    limit is crossed) or not to be an image (from the declared content type
+    or the first chunk's signature).
+
+    Args:
+        file: The uploaded file
+        directory: Where to write the file (defaults to the spool directory)
+        max_bytes: Size limit (defaults to settings.max_upload_bytes)
+        chunk_bytes: Read size (defaults to settings.upload_chunk_bytes)
+
+    Raises:
+        HTTPException: 413 if the upload is too large, 415 if it is not an image
+    """
+    directory = directory or settings.upload_spool_dir
+    max_bytes = max_bytes or settings.max_upload_bytes
+    chunk_bytes = chunk_bytes or settings.upload_chunk_bytes
+
+    if file.size is not None and file.size > max_bytes:
+        raise _too_large()
+    declared_type = (file.content_type or "").split(";")[0].strip().lower()
+    if declared_type and not declared_type.startswith("image/") and declared_type != "application/octet-stream":
+        raise _not_an_image()
+
+    first_chunk = await file.read(chunk_bytes)
+    detected = sniff_image_type(first_chunk)
+    if detected is None:
+        raise _not_an_image()
+    content_type, extension = detected
+
+    await aiofiles.os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{uuid.uuid4().hex}{extension}")
+    digest = hashlib.sha256()
+    size = 0
+
+    try:
+        async with aiofiles.open(path, "wb") as spool:
+            chunk = first_chunk
+            while chunk:
+                size += len(chunk)
+                if size > max_bytes:
+                    raise _too_large()
+                digest.update(chunk)
+                await spool.write(chunk)
+                chunk = await file.read(chunk_bytes)
+    except BaseException:
+        try:
+            await aiofiles.os.remove(path)
+        except FileNotFoundError:
+            pass
+        raise
+
+    return SpooledUpload(path=path, sha256=digest.hexdigest(), size=size, content_type=content_type)
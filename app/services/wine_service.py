@@ -0,0 +1,178 @@
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.wine import Wine, METADATA_COLUMNS, POSITION_INDEX
+from app.schemas.wine import WineFilters
+from app.services.search_service import match_filter
+from app.utils.thumbnails import thumbnail_url
+from app.utils.pagination import apply_keyset, finish_page, DEFAULT_PAGE_SIZE
+
+# Sort key -> (SQL expression, value of that expression for a loaded wine)
+SORT_KEYS = {
+    "added_date": (Wine.added_date, lambda wine: wine.added_date),
+    "name": (Wine.name, lambda wine: wine.name),
+    "vintage": (Wine.vintage, lambda wine: (wine.wine_metadata or {}).get("vintage")),
+}
+
+# Columns of a WineResponse, in its field order, for list_wine_rows
+RESPONSE_COLUMNS = (
+    Wine.name,
+    Wine.id,
+    Wine.storage_id,
+    Wine.position,
+    Wine.added_date,
+    Wine.label_image_url,
+    Wine.description,
+    Wine.wine_metadata,
+)
+
+# Response field -> metadata field listed by get_filter_options
+FILTER_OPTION_FIELDS = {
+    "types": "type",
+    "countries": "country",
+    "regions": "region",
+    "producers": "producer",
+    "vintages": "vintage",
+}
+
+def _unique_violation_message(index_name: str) -> str:
+    # The error SQLite raises for a unique index, which names its columns
+    index = next(index for index in Wine.__table__.indexes if index.name == index_name)
+    columns = ", ".join(f"{index.table.name}.{column.name}" for column in index.columns)
+    return f"UNIQUE constraint failed: {columns}"
+
+_POSITION_CONFLICT_MESSAGE = _unique_violation_message(POSITION_INDEX)
+
+def is_position_conflict(error: IntegrityError) -> bool:
+    """Whether an IntegrityError is a violation of the unique (storage_id, position) index"""
+    orig = error.orig
+    constraint = getattr(getattr(orig, "diag", None), "constraint_name", None)
+    if constraint is not None:
+        return constraint == POSITION_INDEX
+    # SQLite does not report index names, only the violated index's columns.
+    # The error name is only exposed on Python 3.11+; the message alone
+    # identifies the index on older versions.
+    errorname = getattr(orig, "sqlite_errorname", None)
+    return (
+        errorname in (None, "SQLITE_CONSTRAINT_UNIQUE")
+        and str(orig) == _POSITION_CONFLICT_MESSAGE
+    )
+
+def apply_filters(query, filters: WineFilters):
+    """Restrict a Query or Select over Wine to the wines matching the filters"""
+    if filters.storage_id:
+        query = query.filter(Wine.storage_id == filters.storage_id)
+
+    for field in ("type", "country", "region", "producer"):
+        value = getattr(filters, field)
+        if value:
+            query = query.filter(METADATA_COLUMNS[field] == value)
+
+    if filters.vintage_min is not None:
+        query = query.filter(Wine.vintage >= filters.vintage_min)
+    if filters.vintage_max is not None:
+        query = query.filter(Wine.vintage <= filters.vintage_max)
+
+    if filters.search:
+        query = query.filter(match_filter(filters.search))
+
+    return query
+
+def _list_statement(filters: WineFilters, sort: str, descending: bool, cursor: Optional[str], limit: int, columns=None):
+    """
+    Build the statement for one page of list_wines, or of list_wine_rows
+    when columns are given
+
+    Raises:
+        ValueError: If the sort key is unknown or the cursor is malformed
+    """
+    if sort not in SORT_KEYS:
+        raise ValueError(f"Unknown sort key: {sort}")
+
+    sort_column, _ = SORT_KEYS[sort]
+    return apply_keyset(
+        apply_filters(select(*columns) if columns else select(Wine), filters),
+        sort_column=sort_column,
+        id_column=Wine.id,
+        cursor=cursor,
+        limit=limit,
+        descending=descending
+    )
+
+def _response_rows(rows) -> List[dict]:
+    """Plain WineResponse dicts for column rows, bypassing model validation"""
+    items = []
+    for row in rows:
+        item = row._asdict()
+        item["label_thumb_url"] = thumbnail_url(row.label_image_url)
+        items.append(item)
+    return items
+
+def _filter_option_statement(field: str, storage_id: Optional[str]):
+    column = METADATA_COLUMNS[field]
+    statement = select(column).where(column.isnot(None))
+    if storage_id:
+        statement = statement.where(Wine.storage_id == storage_id)
+    return statement.distinct().order_by(column)
+
+def _filter_option_values(field: str, values) -> list:
+    if field == "vintage":
+        return [value for value in values if isinstance(value, int)]
+    return [value for value in values if value != ""]
+
+class AsyncWineService:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_wine_by_id(self, wine_id: str) -> Optional[Wine]:
+        """Get a wine by ID"""
+        return await self.db.get(Wine, wine_id)
+
+    async def list_wines(
+        self,
+        filters: WineFilters,
+        sort: str = "added_date",
+        descending: bool = True,
+        cursor: Optional[str] = None,
+        limit: int = DEFAULT_PAGE_SIZE
+    ) -> Tuple[List[Wine], Optional[str]]:
+        """
+        Get one page of wines matching the filters, ordered by a sort key
+
+        Raises:
+            ValueError: If the sort key is unknown or the cursor is malformed
+        """
+        statement = _list_statement(filters, sort, descending, cursor, limit)
+        wines = (await self.db.execute(statement)).scalars().all()
+        return finish_page(wines, limit, SORT_KEYS[sort][1])
+
+    async def list_wine_rows(
+        self,
+        filters: WineFilters,
+        sort: str = "added_date",
+        descending: bool = True,
+        cursor: Optional[str] = None,
+        limit: int = DEFAULT_PAGE_SIZE
+    ) -> Tuple[List[dict], Optional[str]]:
+        """
+        list_wines returning WineResponse-shaped dicts instead of Wine objects
+
+        Selects only the response columns and skips the ORM identity map and
+        response model validation, for list responses encoded directly.
+
+        Raises:
+            ValueError: If the sort key is unknown or the cursor is malformed
+        """
+        statement = _list_statement(filters, sort, descending, cursor, limit, columns=RESPONSE_COLUMNS)
+        rows, next_cursor = finish_page((await self.db.execute(statement)).all(), limit, SORT_KEYS[sort][1])
+        return _response_rows(rows), next_cursor
+
+    async def get_filter_options(self, storage_id: Optional[str] = None) -> Dict[str, list]:
+        """Get the distinct values available for each filter"""
+        options = {}
+        for name, field in FILTER_OPTION_FIELDS.items():
+            result = await self.db.execute(_filter_option_statement(field, storage_id))
+            options[name] = _filter_option_values(field, result.scalars())
+        return options
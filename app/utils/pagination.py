@@ -0,0 +1,120 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Callable, List, Optional, Tuple
+
+from sqlalchemy import and_, or_
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    """
+    Sort value of a decoded cursor
+
+    Raises:
+        ValueError: If the value is not one encode_cursor produces
+    """
+    if isinstance(value, dict):
+        if set(value) != {"dt"} or not isinstance(value["dt"], str):
+            raise ValueError("Invalid cursor")
+        return datetime.fromisoformat(value["dt"])
+    if value is None or (isinstance(value, (str, int, float)) and not isinstance(value, bool)):
+        return value
+    raise ValueError("Invalid cursor")
+
+
+def encode_cursor(sort_value: Any, row_id: str) -> str:
+    """Encode the position of the last returned row as an opaque cursor"""
+    payload = json.dumps([_encode_value(sort_value), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, str]:
+    """
+    Decode a cursor produced by encode_cursor
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if not isinstance(row_id, str):
+            raise ValueError("Invalid cursor")
+        return _decode_value(sort_value), row_id
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def keyset_after(sort_column, id_column, sort_value: Any, row_id: str, descending: bool):
+    """
+    Build the WHERE clause selecting rows strictly after (sort_value, row_id)
+    in ORDER BY sort_column, id_column.
+
+    SQLite sorts NULL before every other value, so NULL sort values are
+    handled explicitly instead of relying on comparison operators.
+    """
+    if descending:
+        if sort_value is None:
+            return and_(sort_column.is_(None), id_column < row_id)
+        return or_(
+            sort_column < sort_value,
+            and_(sort_column == sort_value, id_column < row_id),
+            sort_column.is_(None),
+        )
+
+    if sort_value is None:
+        return or_(
+            and_(sort_column.is_(None), id_column > row_id),
+            sort_column.isnot(None),
+        )
+    return or_(
+        sort_column > sort_value,
+        and_(sort_column == sort_value, id_column > row_id),
+    )
+
+
+def apply_keyset(
+    query,
+    sort_column,
+    id_column,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    descending: bool = False,
+):
+    """
+    Restrict a Query or Select to the page after cursor, ordered by
+    (sort_column, id_column), fetching one extra row to detect a next page
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    if cursor:
+        sort_value, row_id = decode_cursor(cursor)
+        query = query.filter(keyset_after(sort_column, id_column, sort_value, row_id, descending))
+
+    if descending:
+        query = query.order_by(sort_column.desc(), id_column.desc())
+    else:
+        query = query.order_by(sort_column.asc(), id_column.asc())
+
+    return query.limit(limit + 1)
+
+
+def finish_page(rows: List[Any], limit: int, sort_key: Callable[[Any], Any]) -> Tuple[List[Any], Optional[str]]:
+    """Trim the extra row fetched by apply_keyset and build the next cursor"""
+    if len(rows) <= limit:
+        return list(rows), None
+
+    rows = list(rows[:limit])
+    last = rows[-1]
+    return rows, encode_cursor(sort_key(last), last.id)
+
@@ -0,0 +1,14 @@
+import os
+from typing import Optional
+
+# Longest edge, in pixels, of each thumbnail variant
+THUMBNAIL_SIZES = (160, 480)
+
+# Variant linked from list views as label_thumb_url
+LIST_THUMBNAIL_SIZE = 480
+
+def thumbnail_url(label_image_url: Optional[str], size: int = LIST_THUMBNAIL_SIZE) -> Optional[str]:
+    """URL of a label image thumbnail, or None if the wine has no label image"""
+    if not label_image_url:
+        return None
+    return f"/api/images/thumbs/{size}/{os.path.basename(label_image_url)}"
@@ -0,0 +1 @@
+# benchmarks package
\ No newline at end of file
@@ -0,0 +1,98 @@
+"""
+Benchmark label image preprocessing before the vision call.
+
+Compares the original path (raw photo bytes, base64-encoded as-is) with the
+preprocessed path (EXIF orientation, downscale, re-encode in the image
+process pool) against a local stub of the OpenAI API. Reports the request
+payload size and end-to-end latency of each.
+
+Run from the repository root:
+    python -m benchmarks.bench_label_preprocess --runs 5 --uplink-mbps 20
+"""
+import argparse
+import asyncio
+import base64
+import os
+import statistics
+import tempfile
+import time
+
+from PIL import Image
+
+from app.config import settings
+from app.services import image_service, openai_service
+from benchmarks.stub_openai_server import StubOpenAIServer
+
+def make_phone_photo(path: str, width: int = 4032, height: int = 3024) -> None:
+    """Write a noisy, EXIF-rotated JPEG resembling a phone camera photo"""
+    noise = Image.effect_noise((width, height), 64).convert("RGB")
+    gradient = Image.linear_gradient("L").resize((width, height)).convert("RGB")
+    photo = Image.blend(noise, gradient, 0.5)
+    exif = Image.Exif()
+    exif[0x0112] = 6  # Orientation: rotate 90 degrees clockwise
+    photo.save(path, format="JPEG", quality=95, exif=exif)
+
+async def post_raw(path: str) -> None:
+    """The original request path: raw bytes, always labelled image/jpeg"""
+    with open(path, "rb") as image_file:
+        base64_image = base64.b64encode(image_file.read()).decode("utf-8")
+    payload = {
+        "model": "gpt-4-vision-preview",
+        "messages": [{
+            "role": "user",
+            "content": [{"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{base64_image}"}}]
+        }],
+        "max_tokens": 800
+    }
+    response = await openai_service.get_http_client().post("/chat/completions", json=payload)
+    response.raise_for_status()
+
+async def post_preprocessed(path: str) -> None:
+    result = await openai_service.analyze_wine_label(path)
+    if not result["success"]:
+        raise RuntimeError(result["error"])
+
+async def measure(label: str, call, path: str, runs: int, server: StubOpenAIServer) -> None:
+    await call(path)  # warm up connections and worker processes
+    server.requests.clear()
+
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        await call(path)
+        timings.append(time.perf_counter() - started)
+
+    payload = statistics.mean(request["bytes"] for request in server.requests)
+    print(
+        f"{label:<14} payload {payload / 1024:>9.1f} KiB   "
+        f"latency mean {statistics.mean(timings) * 1000:>8.1f} ms   "
+        f"min {min(timings) * 1000:>8.1f} ms"
+    )
+
+async def main(args) -> None:
+    with tempfile.TemporaryDirectory() as directory, StubOpenAIServer(
+        uplink_bytes_per_second=args.uplink_mbps * 1_000_000 / 8 if args.uplink_mbps else None
+    ) as server:
+        path = os.path.join(directory, "label.jpg")
+        make_phone_photo(path)
+        print(f"source photo   {os.path.getsize(path) / 1024:>9.1f} KiB (4032x3024 JPEG)")
+
+        settings.openai_base_url = server.base_url
+        settings.openai_api_key = settings.openai_api_key or "benchmark"
+        settings.label_image_max_edge = args.max_edge
+        settings.label_image_format = args.format
+
+        try:
+            await measure("before (raw)", post_raw, path, args.runs, server)
+            await measure(f"after ({args.format.lower()})", post_preprocessed, path, args.runs, server)
+        finally:
+            await openai_service.close_http_client()
+            image_service.shutdown_image_executor()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--uplink-mbps", type=float, default=20.0, help="Simulated client uplink; 0 for unlimited")
+    parser.add_argument("--max-edge", type=int, default=settings.label_image_max_edge)
+    parser.add_argument("--format", choices=["JPEG", "WEBP"], default=settings.label_image_format.upper())
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,165 @@
+"""
+Benchmark the GET /api/wine list response path.
+
+Compares the original path (Wine objects validated into WinePage and
+serialized the way FastAPI does for a response_model) with the fast path
+(column rows as dicts, encoded once with orjson) against a scratch SQLite
+database, so times include the query. Measures the first page at page
+sizes the route accepts (up to MAX_PAGE_SIZE), and a walk through the
+whole collection following next_cursor, one request per page.
+
+Run from the repository root:
+    python -m benchmarks.bench_list_serialization --wines 10000 --page-sizes 50 100 500
+"""
+import os
+import tempfile
+
+# Point the app at a scratch database before any app module reads settings
+_scratch = tempfile.mkdtemp(prefix="wine_bench_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_scratch, 'bench.db')}"
+
+import argparse
+import asyncio
+import datetime
+import json
+import random
+import shutil
+import statistics
+import time
+import uuid
+from functools import partial
+from typing import Optional, Tuple
+
+import orjson
+from pydantic import TypeAdapter
+from sqlalchemy import delete, insert
+
+from app.db_init import init_db
+from app.models.database import AsyncSessionLocal, engine
+from app.models.storage import Storage
+from app.models.wine import Wine
+from app.schemas.wine import WineFilters, WinePage
+from app.services.wine_service import AsyncWineService
+from app.utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+
+PAGE_ADAPTER = TypeAdapter(WinePage)
+
+PRODUCERS = ["Château Margaux", "Giacomo Conterno", "Cloudy Bay", "Penfolds", "Marchesi Antinori", "Krug"]
+REGIONS = ["Bordeaux", "Piedmont", "Marlborough", "South Australia", "Tuscany", "Champagne"]
+COUNTRIES = ["France", "Italy", "New Zealand", "Australia", "Italy", "France"]
+TYPES = ["Red", "White", "Rosé", "Sparkling", "Dessert"]
+
+def seed(count: int) -> None:
+    """Replace the wines in the scratch database with count generated wines"""
+    rng = random.Random(count)
+    storage_id = str(uuid.uuid4())
+    started = datetime.datetime(2020, 1, 1)
+
+    with engine.begin() as connection:
+        connection.execute(delete(Wine))
+        connection.execute(delete(Storage))
+        connection.execute(insert(Storage), [{
+            "id": storage_id, "name": "Cellar", "type": "cellar",
+            "zones": [{"name": "Main", "dimensions": {"rows": 1, "columns": count}}],
+            "total_positions": count, "position_naming_scheme": "Sequential Numbering"
+        }])
+
+        batch = []
+        for n in range(count):
+            i = rng.randrange(len(PRODUCERS))
+            batch.append({
+                "id": str(uuid.uuid4()),
+                "name": f"{PRODUCERS[i]} Cuvée {n}",
+                "storage_id": storage_id,
+                "position": str(n + 1),
+                "added_date": started + datetime.timedelta(minutes=n),
+                "label_image_url": f"{uuid.uuid4().hex}.jpg",
+                "description": "Deep ruby with cassis, violets and cedar; firm, fine-grained tannins.",
+                "wine_metadata": {
+                    "producer": PRODUCERS[i], "region": REGIONS[i], "country": COUNTRIES[i],
+                    "type": rng.choice(TYPES), "vintage": rng.randint(1990, 2022),
+                    "varietal": "Cabernet Sauvignon, Merlot"
+                },
+            })
+            if len(batch) == 5000:
+                connection.execute(insert(Wine), batch)
+                batch = []
+        if batch:
+            connection.execute(insert(Wine), batch)
+
+async def model_page(limit: int, cursor: Optional[str] = None) -> Tuple[bytes, Optional[str]]:
+    """The original path: Wine objects through response_model validation and serialization"""
+    async with AsyncSessionLocal() as db:
+        wines, next_cursor = await AsyncWineService(db).list_wines(WineFilters(), cursor=cursor, limit=limit)
+        page = PAGE_ADAPTER.validate_python({"items": wines, "next_cursor": next_cursor})
+        content = PAGE_ADAPTER.dump_python(page, mode="json")
+        body = json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+        return body, next_cursor
+
+async def fast_page(limit: int, cursor: Optional[str] = None) -> Tuple[bytes, Optional[str]]:
+    async with AsyncSessionLocal() as db:
+        wines, next_cursor = await AsyncWineService(db).list_wine_rows(WineFilters(), cursor=cursor, limit=limit)
+        return orjson.dumps({"items": wines, "next_cursor": next_cursor}), next_cursor
+
+async def first_page(page, limit: int) -> Tuple[int, int]:
+    """Rows and bytes of the first page"""
+    body, _ = await page(limit)
+    return limit, len(body)
+
+async def walk(page, limit: int) -> Tuple[int, int]:
+    """Rows and bytes of every page, following next_cursor to the end"""
+    pages = 0
+    size = 0
+    cursor = None
+    while True:
+        body, cursor = await page(limit, cursor)
+        pages += 1
+        size += len(body)
+        if cursor is None:
+            return pages, size
+
+async def measure(label: str, call, runs: int) -> float:
+    await call()  # warm up
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        _, size = await call()
+        timings.append(time.perf_counter() - started)
+
+    best = min(timings)
+    print(
+        f"  {label:<8} {statistics.mean(timings) * 1000:>9.1f} ms mean   {best * 1000:>9.1f} ms min   "
+        f"{size / 1024:>9.0f} KiB"
+    )
+    return best
+
+async def compare(title: str, workload, runs: int) -> None:
+    print(title)
+    before = await measure("before", partial(workload, model_page), runs)
+    after = await measure("after", partial(workload, fast_page), runs)
+    print(f"  speedup  {before / after:.1f}x")
+
+async def main(args) -> None:
+    init_db()
+    try:
+        seed(args.wines)
+        print(f"{args.wines:,} wines")
+        for limit in args.page_sizes:
+            await compare(f"first page, limit {limit}", partial(first_page, limit=limit), args.runs)
+        await compare(
+            f"full walk, limit {MAX_PAGE_SIZE} ({-(-args.wines // MAX_PAGE_SIZE)} pages)",
+            partial(walk, limit=MAX_PAGE_SIZE), args.runs
+        )
+    finally:
+        shutil.rmtree(_scratch, ignore_errors=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--wines", type=int, default=10000)
+    parser.add_argument("--page-sizes", type=int, nargs="+", default=[DEFAULT_PAGE_SIZE, 100, MAX_PAGE_SIZE],
+                        help=f"Page sizes to measure, at most {MAX_PAGE_SIZE}")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+    if max(args.page_sizes) > MAX_PAGE_SIZE:
+        parser.error(f"page sizes above {MAX_PAGE_SIZE} are rejected by GET /api/wine")
+    asyncio.run(main(args))
@@ -0,0 +1,113 @@
+"""
+Benchmark wine metadata extraction from free-text label analyses.
+
+Runs the original multi-regex extractor and the single-pass extractor over
+a corpus of recorded vision model replies (benchmarks/data/label_replies.jsonl,
+one {"reply", "expected"} object per line). Reports throughput and the share
+of fields that match the expected values.
+
+Run from the repository root:
+    python -m benchmarks.bench_metadata_extraction --seconds 2
+"""
+import argparse
+import json
+import os
+import re
+import time
+from typing import Any, Dict, List
+
+from app.services.metadata_extractor import extract_fields
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), "data", "label_replies.jsonl")
+
+FIELDS = ("name", "producer", "vintage", "type", "region", "country", "varietal")
+
+def legacy_extract(description: str) -> Dict[str, Any]:
+    """The original extract_wine_metadata, kept for comparison"""
+    metadata = {
+        "name": "",
+        "producer": "",
+        "vintage": None,
+        "type": "",
+        "varietal": "",
+        "region": "",
+        "country": ""
+    }
+
+    vintage_match = re.search(r'\b(19|20)\d{2}\b', description)
+    if vintage_match:
+        metadata["vintage"] = int(vintage_match.group(0))
+
+    type_patterns = [
+        r'(?:Type|Wine Type|Style):\s*(Red|White|Rosé|Sparkling|Dessert)',
+        r'(?:Type|Wine Type|Style):\s*([^,\n.]+)'
+    ]
+    for pattern in type_patterns:
+        match = re.search(pattern, description, re.IGNORECASE)
+        if match:
+            metadata["type"] = match.group(1).strip()
+            break
+
+    for field in ["name", "producer", "varietal", "region", "country"]:
+        patterns = [
+            rf'(?:{field.title()}):\s*([^,\n.]+)',
+            rf'(?:{field.title()}):\s*([^\n]+)'
+        ]
+        for pattern in patterns:
+            match = re.search(pattern, description, re.IGNORECASE)
+            if match:
+                metadata[field] = match.group(1).strip()
+                break
+
+    metadata["varietal"] = [part.strip() for part in metadata["varietal"].split(",") if part.strip()]
+    return metadata
+
+def load_corpus(path: str) -> List[Dict[str, Any]]:
+    with open(path, encoding="utf-8") as corpus_file:
+        return [json.loads(line) for line in corpus_file if line.strip()]
+
+def normalize(value: Any) -> Any:
+    if isinstance(value, list):
+        return [normalize(item) for item in value]
+    if isinstance(value, str):
+        return value.strip().casefold()
+    return value
+
+def accuracy(extract, corpus: List[Dict[str, Any]]) -> Dict[str, float]:
+    correct = {field: 0 for field in FIELDS}
+    for entry in corpus:
+        extracted = extract(entry["reply"])
+        for field in FIELDS:
+            if normalize(extracted.get(field)) == normalize(entry["expected"][field]):
+                correct[field] += 1
+    return {field: count / len(corpus) for field, count in correct.items()}
+
+def throughput(extract, corpus: List[Dict[str, Any]], seconds: float) -> float:
+    replies = [entry["reply"] for entry in corpus]
+    calls = 0
+    started = time.perf_counter()
+    deadline = started + seconds
+    while time.perf_counter() < deadline:
+        for reply in replies:
+            extract(reply)
+        calls += len(replies)
+    return calls / (time.perf_counter() - started)
+
+def report(label: str, extract, corpus: List[Dict[str, Any]], seconds: float) -> None:
+    per_field = accuracy(extract, corpus)
+    overall = sum(per_field.values()) / len(per_field)
+    rate = throughput(extract, corpus, seconds)
+    fields = "  ".join(f"{field} {share:>4.0%}" for field, share in per_field.items())
+    print(f"{label:<12} {rate:>9,.0f} replies/s   accuracy {overall:>4.0%}   {fields}")
+
+def main(args) -> None:
+    corpus = load_corpus(args.corpus)
+    print(f"corpus       {len(corpus)} replies from {os.path.relpath(args.corpus)}")
+    report("before", legacy_extract, corpus, args.seconds)
+    report("after", extract_fields, corpus, args.seconds)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=CORPUS_PATH)
+    parser.add_argument("--seconds", type=float, default=2.0, help="Time spent measuring each extractor")
+    main(parser.parse_args())
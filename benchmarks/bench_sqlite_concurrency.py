@@ -0,0 +1,141 @@
+"""
+Benchmark concurrent reads and writes against the SQLite engine configuration.
+
+Runs the same workload twice, each in a fresh process with its own scratch
+database: concurrent readers paging through GET /api/wine's query while
+writers add wines one commit at a time. "before" restores SQLite's defaults
+(rollback journal, synchronous=FULL, no mmap, 2 MiB cache); "after" uses the
+engine settings from app.config.
+
+Run from the repository root:
+    python -m benchmarks.bench_sqlite_concurrency --seconds 5 --readers 8 --writers 2
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# SQLite's own defaults, as the engine ran before the pragmas were configurable
+BEFORE_ENV = {
+    "SQLITE_JOURNAL_MODE": "DELETE",
+    "SQLITE_SYNCHRONOUS": "FULL",
+    "SQLITE_MMAP_SIZE": "0",
+    "SQLITE_CACHE_SIZE": "-2000",
+    "SQLITE_BUSY_TIMEOUT_MS": "5000",
+}
+
+SEED_WINES = 5000
+
+async def workload(args) -> dict:
+    """Run readers and writers for args.seconds and return their counts and latencies"""
+    from sqlalchemy import insert
+    from sqlalchemy.exc import OperationalError
+
+    from app.db_init import init_db
+    from app.models.database import AsyncSessionLocal, engine
+    from app.models.wine import Wine
+    from app.schemas.wine import WineFilters
+    from app.services.wine_service import AsyncWineService
+
+    init_db()
+    with engine.begin() as connection:
+        connection.execute(insert(Wine), [
+            {"name": f"Seed {n}", "wine_metadata": {"type": "Red", "vintage": 1990 + n % 30}}
+            for n in range(SEED_WINES)
+        ])
+
+    deadline = time.perf_counter() + args.seconds
+    read_latencies = []
+    write_latencies = []
+    errors = {"read": 0, "write": 0}
+
+    async def reader() -> None:
+        filters = WineFilters(type="Red")
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                async with AsyncSessionLocal() as db:
+                    await AsyncWineService(db).list_wine_rows(filters, limit=50)
+                read_latencies.append(time.perf_counter() - started)
+            except OperationalError:
+                errors["read"] += 1
+
+    async def writer(number: int) -> None:
+        written = 0
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                async with AsyncSessionLocal() as db:
+                    db.add(Wine(name=f"Writer {number} wine {written}", wine_metadata={"type": "White", "vintage": 2020}))
+                    await db.commit()
+                written += 1
+                write_latencies.append(time.perf_counter() - started)
+            except OperationalError:
+                errors["write"] += 1
+
+    await asyncio.gather(
+        *(reader() for _ in range(args.readers)),
+        *(writer(number) for number in range(args.writers))
+    )
+
+    return {
+        "reads": len(read_latencies),
+        "writes": len(write_latencies),
+        "read_p95_ms": _percentile(read_latencies, 95) * 1000,
+        "write_p95_ms": _percentile(write_latencies, 95) * 1000,
+        "read_errors": errors["read"],
+        "write_errors": errors["write"],
+    }
+
+def _percentile(values, percent: int) -> float:
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100)[percent - 1]
+
+def run(label: str, env: dict, args) -> dict:
+    """Run the workload in a child process, so settings are read afresh"""
+    scratch = tempfile.mkdtemp(prefix="wine_bench_")
+    try:
+        child_env = dict(os.environ, **env, DATABASE_URL=f"sqlite:///{os.path.join(scratch, 'bench.db')}")
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_sqlite_concurrency", "--child",
+             "--seconds", str(args.seconds), "--readers", str(args.readers), "--writers", str(args.writers)],
+            env=child_env, check=True, capture_output=True, text=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    print(
+        f"{label:<8} {result['reads'] / args.seconds:>8,.0f} reads/s  p95 {result['read_p95_ms']:>7.1f} ms   "
+        f"{result['writes'] / args.seconds:>6,.0f} writes/s  p95 {result['write_p95_ms']:>7.1f} ms   "
+        f"errors {result['read_errors'] + result['write_errors']}"
+    )
+    return result
+
+def main(args) -> None:
+    if args.child:
+        print(json.dumps(asyncio.run(workload(args))))
+        return
+
+    print(f"{args.readers} readers, {args.writers} writers, {args.seconds:g} s each")
+    before = run("before", BEFORE_ENV, args)
+    after = run("after", {}, args)
+    print(
+        f"speedup  reads {after['reads'] / max(before['reads'], 1):.1f}x   "
+        f"writes {after['writes'] / max(before['writes'], 1):.1f}x"
+    )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    main(parser.parse_args())
@@ -0,0 +1,133 @@
+"""
+Minimal stand-in for the OpenAI chat completions endpoint.
+
+Used by the benchmarks and for testing label analysis locally: point
+OPENAI_BASE_URL at the server's base_url. Each request is answered with a
+fixed reply after an optional model latency, and request bodies are read at
+an optional simulated uplink bandwidth so payload size shows up in timings.
+Requests asking for structured output are answered with a JSON reply.
+
+Run standalone with:
+    python -m benchmarks.stub_openai_server --port 8765
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+DEFAULT_REPLY = (
+    "**Name:** Château Margaux\n"
+    "**Producer:** Château Margaux\n"
+    "**Vintage:** 2015\n"
+    "**Type:** Red\n"
+    "**Varietal:** Cabernet Sauvignon, Merlot\n"
+    "**Region:** Margaux, Bordeaux\n"
+    "**Country:** France\n"
+    "**Description:** Deep ruby with cassis, violets and cedar; firm, fine-grained tannins."
+)
+
+DEFAULT_JSON_REPLY = {
+    "name": "Château Margaux",
+    "producer": "Château Margaux",
+    "vintage": 2015,
+    "type": "Red",
+    "varietal": ["Cabernet Sauvignon", "Merlot"],
+    "region": "Margaux, Bordeaux",
+    "country": "France",
+    "description": "Deep ruby with cassis, violets and cedar; firm, fine-grained tannins."
+}
+
+class StubOpenAIServer:
+    """Threaded HTTP server answering POST /chat/completions"""
+
+    def __init__(
+        self,
+        reply: str = DEFAULT_REPLY,
+        json_reply: Optional[dict] = None,
+        latency_seconds: float = 0.0,
+        uplink_bytes_per_second: Optional[float] = None,
+        host: str = "127.0.0.1",
+        port: int = 0
+    ):
+        self.reply = reply
+        self.json_reply = DEFAULT_JSON_REPLY if json_reply is None else json_reply
+        self.latency_seconds = latency_seconds
+        self.uplink_bytes_per_second = uplink_bytes_per_second
+        self.requests = []
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def reply_for(self, request: dict) -> str:
+        """
+        Content of the assistant message returned for a request
+
+        Requests with a response_format get json_reply serialized as JSON,
+        others get the free-text reply.
+        """
+        if request.get("response_format"):
+            return json.dumps(self.json_reply)
+        return self.reply
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = self.rfile.read(length)
+                if stub.uplink_bytes_per_second:
+                    time.sleep(length / stub.uplink_bytes_per_second)
+                if stub.latency_seconds:
+                    time.sleep(stub.latency_seconds)
+
+                request = json.loads(body or b"{}")
+                stub.requests.append({"bytes": length, "body": request})
+                response = json.dumps({
+                    "choices": [{"message": {"role": "assistant", "content": stub.reply_for(request)}}]
+                }).encode("utf-8")
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(response)))
+                self.end_headers()
+                self.wfile.write(response)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "StubOpenAIServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "StubOpenAIServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Simulated model latency in seconds")
+    args = parser.parse_args()
+
+    server = StubOpenAIServer(latency_seconds=args.latency, port=args.port)
+    print(f"Stub OpenAI API listening on {server.base_url}")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
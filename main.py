@@ -1,13 +1,18 @@
-from fastapi import FastAPI, Request, HTTPException, UploadFile, File, Form
+from fastapi import FastAPI, Request, HTTPException, UploadFile, File, Form, BackgroundTasks
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from fastapi.responses import JSONResponse
 import os
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 import json
 import uuid
 from datetime import datetime
 
+from app.api.images import router as images_router
+from app.services.thumbnail_service import generate_thumbnails
+from app.services.upload_service import spool_image_upload
+from app.utils.thumbnails import thumbnail_url
+
 app = FastAPI()
 
 # Mount static files directory
@@ -17,14 +22,79 @@ app.mount("/static", StaticFiles(directory="static"), name="static")
 os.makedirs("uploads", exist_ok=True)
 app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
 
+# Label image thumbnails
+app.include_router(images_router, prefix="/api")
+
 # Set up templates
 templates = Jinja2Templates(directory="templates")
 
+class IndexedStore:
+    """
+    In-memory record store keyed by id.
+
+    Records live in a primary dict (id -> record) so point lookups, updates
+    and deletes are O(1). Secondary indexes map a field value to the ids of
+    the records holding it and are kept in step on every write, so filtered
+    lists cost time proportional to the result size rather than the store.
+    """
+
+    def __init__(self, indexed_fields: tuple = ()):
+        self._records: Dict[str, dict] = {}
+        # field -> value -> ordered set of ids (dict keys keep insertion order)
+        self._indexes: Dict[str, Dict[Any, Dict[str, None]]] = {
+            field: {} for field in indexed_fields
+        }
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def all(self) -> List[dict]:
+        return list(self._records.values())
+
+    def get(self, record_id: str) -> Optional[dict]:
+        return self._records.get(record_id)
+
+    def find_by(self, field: str, value: Any) -> List[dict]:
+        """Return records whose indexed field equals value"""
+        ids = self._indexes[field].get(value, {})
+        return [self._records[record_id] for record_id in ids]
+
+    def put(self, record: dict) -> dict:
+        """Insert or replace a record, updating secondary indexes"""
+        record_id = record["id"]
+        previous = self._records.get(record_id)
+        if previous is not None:
+            self._unindex(previous)
+        self._records[record_id] = record
+        self._index(record)
+        return record
+
+    def delete(self, record_id: str) -> bool:
+        record = self._records.pop(record_id, None)
+        if record is None:
+            return False
+        self._unindex(record)
+        return True
+
+    def _index(self, record: dict) -> None:
+        for field, index in self._indexes.items():
+            index.setdefault(record.get(field), {})[record["id"]] = None
+
+    def _unindex(self, record: dict) -> None:
+        for field, index in self._indexes.items():
+            value = record.get(field)
+            ids = index.get(value)
+            if ids is None:
+                continue
+            ids.pop(record["id"], None)
+            if not ids:
+                del index[value]
+
 # Mock data for storage
-STORAGE_DATA = []
+STORAGE_DATA = IndexedStore()
 
-# Mock data for wines
-WINE_DATA = []
+# Mock data for wines, indexed by storage for filtered listings
+WINE_DATA = IndexedStore(indexed_fields=("storage_id",))
 
 # Web routes for pages
 @app.get("/")
@@ -46,14 +116,14 @@ async def add_wine(request: Request):
 # API Routes for storage
 @app.get("/api/storage")
 async def get_storage_units():
-    return STORAGE_DATA
+    return STORAGE_DATA.all()
 
 @app.get("/api/storage/{storage_id}")
 async def get_storage_by_id(storage_id: str):
-    for storage in STORAGE_DATA:
-        if storage["id"] == storage_id:
-            return storage
-    raise HTTPException(status_code=404, detail="Storage not found")
+    storage = STORAGE_DATA.get(storage_id)
+    if storage is None:
+        raise HTTPException(status_code=404, detail="Storage not found")
+    return storage
 
 @app.post("/api/storage")
 async def create_storage(storage: dict):
@@ -62,44 +132,39 @@ async def create_storage(storage: dict):
         "id": storage_id,
         **storage
     }
-    STORAGE_DATA.append(new_storage)
-    return new_storage
+    return STORAGE_DATA.put(new_storage)
 
 @app.put("/api/storage/{storage_id}")
 async def update_storage(storage_id: str, storage_data: dict):
-    for i, storage in enumerate(STORAGE_DATA):
-        if storage["id"] == storage_id:
-            STORAGE_DATA[i] = {
-                "id": storage_id,
-                **storage_data
-            }
-            return STORAGE_DATA[i]
-    raise HTTPException(status_code=404, detail="Storage not found")
+    if STORAGE_DATA.get(storage_id) is None:
+        raise HTTPException(status_code=404, detail="Storage not found")
+    return STORAGE_DATA.put({
+        **storage_data,
+        "id": storage_id
+    })
 
 @app.delete("/api/storage/{storage_id}")
 async def delete_storage(storage_id: str):
-    for i, storage in enumerate(STORAGE_DATA):
-        if storage["id"] == storage_id:
-            del STORAGE_DATA[i]
-            return {"success": True}
-    raise HTTPException(status_code=404, detail="Storage not found")
+    if not STORAGE_DATA.delete(storage_id):
+        raise HTTPException(status_code=404, detail="Storage not found")
+    return {"success": True}
 
 # API Routes for wines
 @app.get("/api/wines")
 async def get_wines(storage_id: Optional[str] = None):
     if storage_id:
-        return [wine for wine in WINE_DATA if wine["storage_id"] == storage_id]
-    return WINE_DATA
+        return WINE_DATA.find_by("storage_id", storage_id)
+    return WINE_DATA.all()
 
 @app.get("/api/wines/{wine_id}")
 async def get_wine_by_id(wine_id: str):
-    for wine in WINE_DATA:
-        if wine["id"] == wine_id:
-            return wine
-    raise HTTPException(status_code=404, detail="Wine not found")
+    wine = WINE_DATA.get(wine_id)
+    if wine is None:
+        raise HTTPException(status_code=404, detail="Wine not found")
+    return wine
 
 @app.post("/api/wines")
-async def add_wine(wine_data: str = Form(...), label_image: Optional[UploadFile] = None):
+async def add_wine(background_tasks: BackgroundTasks, wine_data: str = Form(...), label_image: Optional[UploadFile] = None):
     try:
         wine_dict = json.loads(wine_data)
         wine_id = str(uuid.uuid4())
@@ -107,16 +172,9 @@ async def add_wine(wine_data: str = Form(...), label_image: Optional[UploadFile]
         # Handle image upload if provided
         label_image_url = None
         if label_image:
-            # Create a unique filename
-            filename = f"{uuid.uuid4()}{os.path.splitext(label_image.filename)[1]}"
-            file_path = os.path.join("uploads", filename)
-            
-            # Save the file
-            with open(file_path, "wb") as buffer:
-                content = await label_image.read()
-                buffer.write(content)
-            
-            label_image_url = filename
+            # Stream the image into uploads under a unique filename
+            upload = await spool_image_upload(label_image, directory="uploads")
+            label_image_url = upload.filename
         
         # Create the wine entry
         new_wine = {
@@ -125,11 +183,17 @@ async def add_wine(wine_data: str = Form(...), label_image: Optional[UploadFile]
             "label_image_url": label_image_url,
             **wine_dict
         }
+        new_wine["label_thumb_url"] = thumbnail_url(new_wine["label_image_url"])
         
-        WINE_DATA.append(new_wine)
-        return new_wine
+        # Render thumbnails after responding so the collection grid never waits on them
+        if new_wine["label_image_url"]:
+            background_tasks.add_task(generate_thumbnails, new_wine["label_image_url"])
+        
+        return WINE_DATA.put(new_wine)
     except json.JSONDecodeError:
         raise HTTPException(status_code=400, detail="Invalid JSON in wine_data")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -137,12 +201,8 @@ async def add_wine(wine_data: str = Form(...), label_image: Optional[UploadFile]
 async def analyze_wine_label(label_image: UploadFile = File(...)):
     try:
         # Save the uploaded image
-        filename = f"{uuid.uuid4()}{os.path.splitext(label_image.filename)[1]}"
-        file_path = os.path.join("uploads", filename)
-        
-        with open(file_path, "wb") as buffer:
-            content = await label_image.read()
-            buffer.write(content)
+        upload = await spool_image_upload(label_image, directory="uploads")
+        filename = upload.filename
         
         # Mock analysis results - in a real app, you'd call OpenAI here
         analysis_result = {
@@ -161,6 +221,8 @@ async def analyze_wine_label(label_image: UploadFile = File(...)):
         }
         
         return analysis_result
+    except HTTPException:
+        raise
     except Exception as e:
         return {
             "success": False,
@@ -169,22 +231,22 @@ async def analyze_wine_label(label_image: UploadFile = File(...)):
 
 @app.put("/api/wines/{wine_id}")
 async def update_wine(wine_id: str, wine_data: dict):
-    for i, wine in enumerate(WINE_DATA):
-        if wine["id"] == wine_id:
-            WINE_DATA[i] = {
-                **wine,
-                **wine_data
-            }
-            return WINE_DATA[i]
-    raise HTTPException(status_code=404, detail="Wine not found")
+    wine = WINE_DATA.get(wine_id)
+    if wine is None:
+        raise HTTPException(status_code=404, detail="Wine not found")
+    updated_wine = {
+        **wine,
+        **wine_data,
+        "id": wine_id
+    }
+    updated_wine["label_thumb_url"] = thumbnail_url(updated_wine.get("label_image_url"))
+    return WINE_DATA.put(updated_wine)
 
 @app.delete("/api/wines/{wine_id}")
 async def delete_wine(wine_id: str):
-    for i, wine in enumerate(WINE_DATA):
-        if wine["id"] == wine_id:
-            del WINE_DATA[i]
-            return {"success": True}
-    raise HTTPException(status_code=404, detail="Wine not found")
+    if not WINE_DATA.delete(wine_id):
+        raise HTTPException(status_code=404, detail="Wine not found")
+    return {"success": True}
 
 # Sample data initialization
 def init_sample_data():
@@ -206,7 +268,7 @@ def init_sample_data():
         "total_positions": 24
     }
     
-    STORAGE_DATA.append(sample_storage)
+    STORAGE_DATA.put(sample_storage)
     
     # Sample wine
     sample_wine = {
@@ -223,7 +285,7 @@ def init_sample_data():
         "description": "A wonderful red wine with notes of black fruits and oak."
     }
     
-    WINE_DATA.append(sample_wine)
+    WINE_DATA.put(sample_wine)
 
 # Initialize sample data
 init_sample_data()